@@ -5,6 +5,7 @@ import { IERC20 } from "openzeppelin-contracts/contracts/token/ERC20/IERC20.sol"
 import { SafeERC20 } from "openzeppelin-contracts/contracts/token/ERC20/utils/SafeERC20.sol";
 import { Ownable } from "openzeppelin-contracts/contracts/access/Ownable.sol";
 import { ECDSA } from "openzeppelin-contracts/contracts/utils/cryptography/ECDSA.sol";
+import { MerkleProof } from "openzeppelin-contracts/contracts/utils/cryptography/MerkleProof.sol";
 
 contract DarkPoolSettlement is Ownable {
     using SafeERC20 for IERC20;
@@ -24,8 +25,12 @@ contract DarkPoolSettlement is Ownable {
     mapping(bytes32 => bool) public executed;
     address public enclaveSigner;
 
+    // batch root => signer that signed it (checked once, reused by later calls)
+    mapping(bytes32 => address) public rootSigner;
+
     event Settled(address indexed maker, address indexed taker, uint256 amountA, uint256 amountB);
     event EnclaveSignerUpdated(address oldSigner, address newSigner);
+    event BatchRootVerified(bytes32 indexed root, address signer);
 
     constructor(address _enclaveSigner) Ownable(msg.sender) {
         require(_enclaveSigner != address(0), "Invalid signer");
@@ -39,18 +44,52 @@ contract DarkPoolSettlement is Ownable {
     }
 
     function settle(Trade calldata t, bytes calldata signature) external {
-        require(block.timestamp <= t.deadline, "Expired");
-        require(t.tokenA != address(0) && t.tokenB != address(0), "Invalid token");
-        require(t.maker == address(this), "Maker must be contract");
-
-        bytes32 hash = _hashTrade(t);
-        require(!executed[hash], "Already executed");
+        bytes32 hash = _checkTrade(t);
 
         // check signature
         bytes32 ethSigned = keccak256(abi.encodePacked("\x19Ethereum Signed Message:\n32", hash));
         address recovered = ECDSA.recover(ethSigned, signature);
         require(recovered == enclaveSigner, "Invalid enclave signature");
 
+        _execute(t, hash);
+    }
+
+    /// @notice Settle trades from a batch whose Merkle root the enclave signed once.
+    /// @dev Leaves are _hashTrade(t); proofs use OpenZeppelin's sorted-pair hashing.
+    ///      The root signature is only recovered on first use for the current signer.
+    function settleBatch(
+        Trade[] calldata trades,
+        bytes32[][] calldata proofs,
+        bytes32 root,
+        bytes calldata signature
+    ) external {
+        require(trades.length == proofs.length, "Length mismatch");
+
+        if (rootSigner[root] != enclaveSigner) {
+            bytes32 ethSigned = keccak256(abi.encodePacked("\x19Ethereum Signed Message:\n32", root));
+            address recovered = ECDSA.recover(ethSigned, signature);
+            require(recovered == enclaveSigner, "Invalid enclave signature");
+            rootSigner[root] = recovered;
+            emit BatchRootVerified(root, recovered);
+        }
+
+        for (uint256 i = 0; i < trades.length; i++) {
+            bytes32 hash = _checkTrade(trades[i]);
+            require(MerkleProof.verifyCalldata(proofs[i], root, hash), "Invalid proof");
+            _execute(trades[i], hash);
+        }
+    }
+
+    function _checkTrade(Trade calldata t) internal view returns (bytes32 hash) {
+        require(block.timestamp <= t.deadline, "Expired");
+        require(t.tokenA != address(0) && t.tokenB != address(0), "Invalid token");
+        require(t.maker == address(this), "Maker must be contract");
+
+        hash = _hashTrade(t);
+        require(!executed[hash], "Already executed");
+    }
+
+    function _execute(Trade calldata t, bytes32 hash) internal {
         executed[hash] = true;
 
         // maker sends tokenA to taker
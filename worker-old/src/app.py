@@ -1,18 +1,45 @@
-import os, json
-from orderbook import load_book, save_book, add_orders, prune_expired, sort_book, export_orderbook
-from match_engine import build_trade, sign_trade, try_match
+import os, json, time, itertools
+from orderbook import CorruptBookError, load_book, save_book, add_orders, prune_expired, export_orderbook
+from auction import clear
+from match_engine import build_trade, net_fills, sign_batch, sweep
+from intake import Quarantine, read_orders
 from mm_bot import inject_mm_quotes
+from mm_strategy import InventorySkewStrategy, StaticStrategy
+from order import is_address
+from protected_data import dataset_paths, load_orders
+from precheck import FundingChecker, drop_unfunded
+from signer import TradeSigner
 from dotenv import load_dotenv
+from web3 import Web3
+from web3.exceptions import Web3Exception
 
 # -------------------------------------------------
 # 1️⃣  Environment
 # -------------------------------------------------
 load_dotenv()
 ENCLAVE_PRIV = os.getenv("ENCLAVE_PRIV")
-BASE_TOKEN = os.getenv("BASE_TOKEN", "0xWETHm")
-QUOTE_TOKEN = os.getenv("QUOTE_TOKEN", "0xUSDCm")
-MM_ADDRESS = os.getenv("ENCLAVE_PRIV", "0x000000000000000000000000000000000000dEaD")
+# default to the mock tokens deployed next to the settlement contract
+BASE_TOKEN = os.getenv("BASE_TOKEN") or os.getenv("WETHM_ADDR")
+QUOTE_TOKEN = os.getenv("QUOTE_TOKEN") or os.getenv("USDCM_ADDR")
+MM_ADDRESS = os.getenv("MM_ADDRESS", "0x000000000000000000000000000000000000dEaD")
 REF_PRICE = float(os.getenv("REF_PRICE", "2000.0"))
+# "skew": inventory/volatility-aware quotes; "static": fixed symmetric ladder
+MM_STRATEGY = os.getenv("MM_STRATEGY", "skew")
+# "batch": sign one Merkle root per run instead of one signature per trade
+SIGN_MODE = os.getenv("SIGN_MODE", "single")
+# signing processes for large runs (1 = sign in-process)
+SIGN_WORKERS = int(os.getenv("SIGN_WORKERS", str(os.cpu_count() or 1)))
+# threads decoding protected datasets (bulk tasks carry many)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "8"))
+# "continuous": price-time sweep at pairwise prices; "auction": uniform-price batch clearing
+MATCH_MODE = os.getenv("MATCH_MODE", "continuous")
+# merge fills between the same counterparties into one settle() per run
+NET_TRADES = os.getenv("NET_TRADES", "1") == "1"
+# PRECHECK=1: drop orders that can't be funded on-chain before matching (needs RPC_URL)
+PRECHECK = os.getenv("PRECHECK", "0") == "1"
+RPC_URL = os.getenv("RPC_URL")
+# every trade's maker: settle() pays tokenA from this contract's balance
+SETTLEMENT_ADDR = os.getenv("SETTLEMENT_ADDR")
 
 IEXEC_IN = os.getenv("IEXEC_IN", "./iexec_in")
 IEXEC_OUT = os.getenv("IEXEC_OUT", "./iexec_out")
@@ -20,6 +47,7 @@ os.makedirs(IEXEC_OUT, exist_ok=True)
 
 ORDERS_PATH = os.path.join(IEXEC_IN, "orders.json")
 RESULT_PATH = os.path.join(IEXEC_OUT, "result.json")
+QUARANTINE_PATH = os.path.join(IEXEC_OUT, "quarantine.jsonl")
 
 # -------------------------------------------------
 # 2️⃣  Main Worker Logic
@@ -29,73 +57,157 @@ def main():
 
     if not ENCLAVE_PRIV:
         raise SystemExit("❌ ENCLAVE_PRIV not set")
+    # trades name these on-chain; fail before touching the book, not at signing
+    for name, value in (("BASE_TOKEN", BASE_TOKEN), ("QUOTE_TOKEN", QUOTE_TOKEN),
+                        ("SETTLEMENT_ADDR", SETTLEMENT_ADDR)):
+        if not is_address(value):
+            raise SystemExit(f"❌ {name} must be a 0x-prefixed 20-byte address, got {value!r}")
 
-    # --- Load or init orderbook ---
-    book = load_book()
+    # bad records from any source (a migrated JSON book, orders.json,
+    # protected datasets) go to quarantine.jsonl with the reason
+    quarantine = Quarantine(QUARANTINE_PATH)
+
+    # --- Load or init orderbook (refuse to trade on a corrupt one) ---
+    try:
+        book = load_book(quarantine)
+    except CorruptBookError as e:
+        raise SystemExit(f"❌ {e}")
     print("book loaded  ..  " ,book)
 
     # --- Inject Market Maker quotes ---
+    if MM_STRATEGY == "skew":
+        strategy = InventorySkewStrategy.load(spread_bps=50, size_base=1.0)
+    else:
+        strategy = StaticStrategy(spread_bps=50, size_base=1.0)   # 0.5% spread
     inject_mm_quotes(
         book=book,
         ref_price=REF_PRICE,
         mm_address=MM_ADDRESS,
         base_token=BASE_TOKEN,
         quote_token=QUOTE_TOKEN,
-        spread_bps=50,   # 0.5% spread
-        size_base=1.0,
+        strategy=strategy,
     )
 
     print("book loaded  ..  " ,book)
 
-    # --- Load user orders (if any) ---
-    if os.path.exists(ORDERS_PATH):
-        with open(ORDERS_PATH) as f:
-            orders = json.load(f)
-            print(f"📥 Loaded {len(orders)} user orders.")
-            add_orders(book, orders)
+    # --- Load user orders (if any): orders.json + protected datasets, one batch ---
+    # orders.json is streamed and validated record by record
+    with quarantine:
+        incoming = read_orders(ORDERS_PATH, quarantine) if os.path.exists(ORDERS_PATH) else iter(())
+
+        protected, rejected = load_orders(dataset_paths(IEXEC_IN), workers=INGEST_WORKERS)
+        if protected or rejected:
+            print(f"🔐 Loaded {len(protected)} protected order(s), rejected {len(rejected)}.")
+        for path, reason in rejected:
+            quarantine.add(os.path.basename(path), reason)
+
+        added = add_orders(book, itertools.chain(incoming, protected))
+    print(f"📥 Loaded {added} user orders.")
+    if quarantine.count:
+        print(f"🚫 Quarantined {quarantine.count} bad record(s) -> {QUARANTINE_PATH}")
+
+    # --- Clean (book stays sorted: add_orders / MM quotes insert in place) ---
+    expired = prune_expired(book)
+    if expired:
+        print(f"⌛ Pruned {expired} expired order(s).")
+
+    # --- Funding pre-check: one aggregated balance/allowance read ---
+    if PRECHECK and RPC_URL and SETTLEMENT_ADDR:
+        checker = FundingChecker(Web3(Web3.HTTPProvider(RPC_URL)), SETTLEMENT_ADDR)
+        try:
+            # the MM's quotes are re-synced every run by mm_bot; only user orders are checked
+            unfunded = drop_unfunded(book, checker, exempt=MM_ADDRESS)
+        except (OSError, Web3Exception) as e:
+            # requests' connection errors are OSErrors; the book is untouched
+            print(f"⚠️ Funding pre-check skipped, RPC failed: {e}")
+        else:
+            if unfunded:
+                print(f"💸 Dropped {unfunded} unfunded order(s).")
+
+    # --- Match: sweep until nothing crosses, or clear one batch auction per pair ---
+    matches = clear(book) if MATCH_MODE == "auction" else sweep(book)
+
+    # --- Feed fills back to the quoting model (MM inventory + realized vol) ---
+    # only the MM's own pair: other pairs' prices would pollute the vol window
+    mm = MM_ADDRESS.lower()
+    mm_pair = (BASE_TOKEN.lower(), QUOTE_TOKEN.lower())
+    traded = notional = 0.0
+    for buy, sell, price, amount_base, _ in matches:
+        if buy.pair != mm_pair:
+            continue
+        delta = (amount_base if buy.owner.lower() == mm else 0) - (amount_base if sell.owner.lower() == mm else 0)
+        strategy.on_fill(price, delta)
+        traded += amount_base
+        notional += price * amount_base
+    if traded:
+        # one price per run: fills within a run walk the MM's own ladder
+        strategy.on_run(notional / traded)
+
+    if not matches:
+        print("ℹ️ No match found: no crossing quotes")
+        result = {"status": "no_match", "reason": "no crossing quotes"}
+    else:
+        result = settle_result(matches)
+
+    with open(RESULT_PATH, "w") as f:
+        json.dump(result, f, indent=2)
 
-    # --- Clean + sort ---
-    prune_expired(book)
-    sort_book(book)
+    # --- Persist only once the run's result is out: a crash before this
+    # point leaves the book (and MM state) as they were before the run ---
+    save_book(book)
+    if isinstance(strategy, InventorySkewStrategy):
+        strategy.save()
 
-    # --- Attempt match ---
-    try:
-        buy, sell, price = try_match(book)
-    except Exception as e:
-        print(f"ℹ️ No match found: {e}")
-        save_book(book)
-        result = {"status": "no_match", "reason": str(e)}
-        with open(RESULT_PATH, "w") as f:
-            json.dump(result, f, indent=2)
+    if not matches:
         print("✅ Result written: no match.")
         return
+    print("✅ Matches written to /iexec_out/result.json")
+    print(json.dumps(result, indent=2))
 
-    print(f"✅ Match found! Price {price}")
-    trade = build_trade(buy, sell)
-    sig, enclave = sign_trade(trade, ENCLAVE_PRIV)
-
-    # Remove executed orders
-    if buy in book["buy"]:
-        book["buy"].remove(buy)
-    if sell in book["sell"]:
-        book["sell"].remove(sell)
-    save_book(book)
 
-    result = {
+def settle_result(matches) -> dict:
+    """Trades for this run's fills, netted and signed by the enclave key."""
+    # every trade in a run gets its own nonce: (run_nonce << 32) + index
+    run_nonce = time.time_ns()
+    trades = [
+        {"price": price, "trade": build_trade(buy, sell, SETTLEMENT_ADDR, amount_base, amount_quote,
+                                              nonce=(run_nonce << 32) + i)}
+        for i, (buy, sell, price, amount_base, amount_quote) in enumerate(matches)
+    ]
+    print(f"✅ {len(trades)} fill(s) found!")
+
+    # --- Net repeated counterparties into one settle() each ---
+    if NET_TRADES:
+        trades = net_fills(trades, run_nonce)
+        print(f"🧮 Netted into {len(trades)} trade(s).")
+
+    # key loaded and enclave address derived once for the whole run
+    signer = TradeSigner(ENCLAVE_PRIV, workers=SIGN_WORKERS)
+    if SIGN_MODE == "batch":
+        root, sig, hashes, proofs = sign_batch([t["trade"] for t in trades], signer)
+        for t, h, proof in zip(trades, hashes, proofs):
+            t["hash"] = h
+            t["proof"] = proof
+        return {
+            "status": "matched",
+            "mode": "batch",
+            "root": root,
+            "signature": sig,
+            "trades": trades,
+            "enclave": signer.address,
+        }
+    sigs = signer.sign_trades([t["trade"] for t in trades])
+    for t, sig in zip(trades, sigs):
+        t["signature"] = sig
+    return {
         "status": "matched",
-        "price": price,
-        "trade": trade,
-        "signature": sig,
-        "enclave": enclave,
+        "trades": trades,
+        "enclave": signer.address,
     }
-    with open(RESULT_PATH, "w") as f:
-        json.dump(result, f, indent=2)
-
-    print("✅ Match written to /iexec_out/result.json")
-    print(json.dumps(result, indent=2))
-
 
 if __name__ == "__main__":
     main()
 
-    export_orderbook()
\ No newline at end of file
+    # optional human-readable dump of the binary book for debugging
+    if os.getenv("EXPORT_ORDERBOOK"):
+        export_orderbook(os.path.join(IEXEC_OUT, "orderbook.json"))
\ No newline at end of file
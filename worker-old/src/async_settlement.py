@@ -0,0 +1,166 @@
+"""
+asyncio settlement and balance client.
+
+One pooled aiohttp session is shared by every request. Independent reads
+(balanceOf, allowance, ...) go out as a single JSON-RPC batch, settlement
+transactions are encoded and signed locally and sent concurrently, and
+receipts are polled with asyncio.gather, so N trades cost a few round
+trips instead of N.
+
+    async with AsyncSettlement(RPC_URL, SETTLEMENT_ADDR, abi, TAKER_PRIV) as chain:
+        before = await chain.balances([(WETHM_ADDR, taker), (USDCM_ADDR, taker)])
+        receipts = await chain.wait_all(await chain.settle_many(signed_trades))
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from eth_account import Account
+from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3.exceptions import TransactionNotFound
+
+from settlement import _sig_bytes
+from trade_hash import checksum, trade_tuple
+
+ERC20_ABI = [
+    {"type": "function", "name": "balanceOf", "stateMutability": "view",
+     "inputs": [{"name": "account", "type": "address"}],
+     "outputs": [{"name": "", "type": "uint256"}]},
+    {"type": "function", "name": "allowance", "stateMutability": "view",
+     "inputs": [{"name": "owner", "type": "address"}, {"name": "spender", "type": "address"}],
+     "outputs": [{"name": "", "type": "uint256"}]},
+]
+
+
+class AsyncSettlement:
+    def __init__(self, rpc_url: str, settlement_addr: str, settlement_abi: list,
+                 privkey_hex: Optional[str] = None, chain_id: Optional[int] = None,
+                 pool_size: int = 16, gas: int = 800_000, priority_fee_gwei: int = 1):
+        self.rpc_url = rpc_url
+        self.settlement_addr = checksum(settlement_addr)
+        self.settlement_abi = settlement_abi
+        self.account = Account.from_key(privkey_hex) if privkey_hex else None
+        self.chain_id = chain_id
+        self.pool_size = pool_size
+        self.gas = gas
+        self.priority_fee = AsyncWeb3.to_wei(priority_fee_gwei, "gwei")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tokens: Dict[str, object] = {}
+        self._nonce: Optional[int] = None
+        self._nonce_lock = asyncio.Lock()
+        self._fee_block: Optional[int] = None
+        self._fees: Dict[str, int] = {}
+
+    async def __aenter__(self) -> "AsyncSettlement":
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        provider = AsyncHTTPProvider(self.rpc_url)
+        await provider.cache_async_session(self._session)
+        self.w3 = AsyncWeb3(provider)
+        self.settlement = self.w3.eth.contract(address=self.settlement_addr, abi=self.settlement_abi)
+        if self.chain_id is None:
+            self.chain_id = await self.w3.eth.chain_id
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+
+    def token(self, address: str):
+        address = checksum(address)
+        if address not in self._tokens:
+            self._tokens[address] = self.w3.eth.contract(address=address, abi=ERC20_ABI)
+        return self._tokens[address]
+
+    # ---------- reads ----------
+    async def call_batch(self, fns: list) -> list:
+        """Execute many contract reads as one JSON-RPC batch request."""
+        if not fns:
+            return []
+        async with self.w3.batch_requests() as batch:
+            for fn in fns:
+                batch.add(fn)
+            return await batch.async_execute()
+
+    async def balances(self, queries: Iterable[Tuple[str, str]]) -> List[int]:
+        """balanceOf for each (token, owner), in one round trip."""
+        return await self.call_batch([self.token(t).functions.balanceOf(checksum(o))
+                                      for t, o in queries])
+
+    async def allowances(self, queries: Iterable[Tuple[str, str, str]]) -> List[int]:
+        """allowance for each (token, owner, spender), in one round trip."""
+        return await self.call_batch([self.token(t).functions.allowance(checksum(o), checksum(s))
+                                      for t, o, s in queries])
+
+    # ---------- nonce / fees ----------
+    async def _next_nonces(self, n: int) -> List[int]:
+        async with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = await self.w3.eth.get_transaction_count(self.account.address, "pending")
+            first = self._nonce
+            self._nonce += n
+        return list(range(first, first + n))
+
+    async def fees(self) -> Dict[str, int]:
+        """EIP-1559 fee fields, recomputed only when a new block is seen."""
+        block = await self.w3.eth.get_block("latest")
+        if block["number"] != self._fee_block:
+            self._fee_block = block["number"]
+            self._fees = {
+                "maxFeePerGas": block["baseFeePerGas"] * 2 + self.priority_fee,
+                "maxPriorityFeePerGas": self.priority_fee,
+            }
+        return self._fees
+
+    # ---------- settlement ----------
+    def _signed(self, data: str, nonce: int, fees: Dict[str, int]) -> bytes:
+        tx = {
+            "to": self.settlement_addr,
+            "data": data,
+            "value": 0,
+            "nonce": nonce,
+            "gas": self.gas,
+            "chainId": self.chain_id,
+            **fees,
+        }
+        return self.account.sign_transaction(tx).raw_transaction
+
+    async def settle_many(self, signed_trades: Iterable[Tuple[dict, str]]) -> List[bytes]:
+        """Encode, sign and send settle() for every trade concurrently."""
+        calls = [self.settlement.encode_abi("settle", args=[trade_tuple(t), _sig_bytes(sig)])
+                 for t, sig in signed_trades]
+        if not calls:
+            return []
+        fees, nonces = await asyncio.gather(self.fees(), self._next_nonces(len(calls)))
+        raws = [self._signed(data, nonce, fees) for data, nonce in zip(calls, nonces)]
+        try:
+            return await asyncio.gather(*(self.w3.eth.send_raw_transaction(r) for r in raws))
+        except Exception:
+            self._nonce = None
+            raise
+
+    async def _receipt(self, tx_hash: bytes):
+        try:
+            return await self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    async def wait_all(self, tx_hashes: List[bytes], timeout: float = 60, poll: float = 0.5) -> list:
+        """Receipts for every hash, in input order."""
+        receipts = [None] * len(tx_hashes)
+        pending = list(range(len(tx_hashes)))
+        deadline = time.time() + timeout
+        while pending:
+            found = await asyncio.gather(*(self._receipt(tx_hashes[i]) for i in pending))
+            pending_next = []
+            for i, r in zip(pending, found):
+                if r is None:
+                    pending_next.append(i)
+                else:
+                    receipts[i] = r
+            pending = pending_next
+            if not pending:
+                break
+            if time.time() > deadline:
+                raise TimeoutError(f"{len(pending)} transaction(s) not mined after {timeout}s")
+            await asyncio.sleep(poll)
+        return receipts
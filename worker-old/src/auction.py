@@ -0,0 +1,120 @@
+"""
+Frequent batch auction: clear everything that crosses in a run at one
+uniform price per pair.
+
+For each pair the limit prices of both sides become the candidate
+prices. Aggregate demand (bids at or above a price) and supply (asks at or
+below it) are built as cumulative sums in one vectorized pass, and the
+clearing price is the candidate that executes the most volume (ties:
+smallest imbalance, then the midpoint of the tied range, which executes
+the same volume). Volumes are summed as exact integers. Every eligible order on
+the short side fills completely; the long side is filled in price-time
+priority. All fills of a run trade at the clearing price, so the
+sequence in which orders meet within a run no longer affects what
+anyone pays.
+
+Fills come back in the same (buy, sell, price, base, quote) shape as
+match_engine.sweep, so the rest of the pipeline is unchanged.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from match_engine import apply_fill, remaining
+from order import PRICE_SCALE, Order, ticks_to_price
+from orderbook import Book, Pair, remove_orders
+
+Fill = Tuple[Order, Order, float, int, int]
+
+
+def _priority(o: Order) -> tuple:
+    # market orders first, then price, then time
+    px = 0 if o.is_market else (-o.price if o.is_buy else o.price)
+    return (not o.is_market, px, o.ts or 0)
+
+
+def clearing_price(bids: List[Order], asks: List[Order]) -> Optional[int]:
+    """Uniform clearing price in ticks, or None if nothing crosses."""
+    prices = sorted({o.price for o in bids + asks if not o.is_market})
+    if not prices:
+        return None
+    idx = {p: i for i, p in enumerate(prices)}
+    k = len(prices)
+
+    # a bid counts towards demand at every price up to its limit, an ask
+    # towards supply from its limit up; market orders at every price
+    bid_idx = np.fromiter((k - 1 if o.is_market else idx[o.price] for o in bids), np.intp, len(bids))
+    ask_idx = np.fromiter((0 if o.is_market else idx[o.price] for o in asks), np.intp, len(asks))
+    # token amounts overflow int64/float64, so sums stay Python ints (object arrays)
+    bid_qty = np.zeros(k, dtype=object)
+    ask_qty = np.zeros(k, dtype=object)
+    np.add.at(bid_qty, bid_idx, [remaining(o) for o in bids])
+    np.add.at(ask_qty, ask_idx, [remaining(o) for o in asks])
+
+    demand = np.cumsum(bid_qty[::-1])[::-1]
+    supply = np.cumsum(ask_qty)
+    volume = np.minimum(demand, supply)
+    if volume.max() <= 0:
+        return None
+
+    best = np.flatnonzero(volume == volume.max())
+    imbalance = np.abs(demand - supply)[best]
+    best = best[imbalance == imbalance.min()]
+    # volume is unimodal in price, so every price between the tied
+    # candidates clears the same volume
+    return (prices[best[0]] + prices[best[-1]]) // 2
+
+
+def clear_pair(book: Book, pair: Pair, base_decimals: int = 18, quote_decimals: int = 18) -> List[Fill]:
+    """Run one auction on a pair's partition; fills are applied to the book."""
+    part = book[pair]
+    bids = [o for o in part["buy"] if remaining(o) > 0]
+    asks = [o for o in part["sell"] if remaining(o) > 0]
+    if not bids or not asks:
+        return []
+    px = clearing_price(bids, asks)
+    if px is None:
+        return []
+
+    bids = sorted((o for o in bids if o.is_market or o.price >= px), key=_priority)
+    asks = sorted((o for o in asks if o.is_market or o.price <= px), key=_priority)
+    volume = min(sum(map(remaining, bids)), sum(map(remaining, asks)))
+
+    # base in base-token units -> quote in quote-token units at the uniform price
+    num = px * 10 ** quote_decimals
+    den = PRICE_SCALE * 10 ** base_decimals
+    price = ticks_to_price(px)
+
+    fills: List[Fill] = []
+    done = set()
+    i = j = 0
+    while volume > 0:
+        buy, sell = bids[i], asks[j]
+        base = min(remaining(buy), remaining(sell), volume)
+        apply_fill(buy, base)
+        apply_fill(sell, base)
+        fills.append((buy, sell, price, base, base * num // den))
+        volume -= base
+        if remaining(buy) <= 0:
+            done.add(buy)
+            i += 1
+        if remaining(sell) <= 0:
+            done.add(sell)
+            j += 1
+
+    # at most one order per side is left partially filled
+    for o in {f[0] for f in fills} | {f[1] for f in fills}:
+        if o not in done:
+            book.log_fill(o)
+    if done:
+        for side in ("buy", "sell"):
+            remove_orders(book, pair, side, done, "fill")
+    return fills
+
+
+def clear(book: Book, base_decimals: int = 18, quote_decimals: int = 18) -> List[Fill]:
+    """Batch-auction counterpart of match_engine.sweep: one clearing per pair."""
+    fills: List[Fill] = []
+    for pair in list(book):
+        fills.extend(clear_pair(book, pair, base_decimals, quote_decimals))
+    return fills
@@ -0,0 +1,140 @@
+"""
+Streaming intake for orders.json.
+
+The file is read in fixed-size chunks and the top-level array is decoded
+one element at a time, so peak memory is one chunk plus one record no
+matter how large the file is. Every record goes through
+order.parse_order as it is read; valid ones are yielded as Orders (ready
+for orderbook.add_orders), bad ones are written to a quarantine file
+with the reason and never reach the book:
+
+    with Quarantine(os.path.join(IEXEC_OUT, "quarantine.jsonl")) as q:
+        add_orders(book, read_orders(ORDERS_PATH, q))
+"""
+import json
+import os
+from typing import Any, Iterator, Optional, TextIO
+
+from order import InvalidOrder, Order, parse_order
+
+CHUNK_SIZE = 1 << 16
+
+_WS = " \t\r\n"
+# characters a JSON number can continue with
+_NUM_TAIL = frozenset("0123456789+-.eE")
+# longest token prefix the decoder reports at its start, e.g. "Infinit", "\\u12"
+_MAX_CUT = 8
+
+
+def _truncated(e: json.JSONDecodeError, end: int) -> bool:
+    """Whether a decode error can be the buffer ending mid-value rather than bad JSON."""
+    return e.pos >= end - _MAX_CUT or e.msg.startswith("Unterminated string")
+
+
+class Quarantine:
+    """Rejected records, one JSON line each: source, reason, index, record."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f: Optional[TextIO] = None
+
+    def add(self, source: str, reason: str, index: Optional[int] = None, record: Any = None) -> None:
+        if self._f is None:
+            self._f = open(self.path, "w")
+        entry = {"source": source, "reason": reason}
+        if index is not None:
+            entry["index"] = index
+        if record is not None:
+            entry["record"] = record
+        self._f.write(json.dumps(entry) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self) -> "Quarantine":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_array(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array read incrementally from f.
+
+    Raises ValueError (with the character offset) on malformed JSON; the
+    elements before the error have already been yielded.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, base, eof = "", 0, 0, False
+
+    def more() -> bool:
+        nonlocal buf, pos, base, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        base += pos
+        buf, pos = buf[pos:] + chunk, 0
+        return not eof
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf) or not more():
+                return buf[pos] if pos < len(buf) else ""
+
+    def value() -> Any:
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # only an error the next chunk could resolve reads on; a
+                # malformed record fails here without pulling in the file
+                if _truncated(e, len(buf)) and more():
+                    continue
+                raise ValueError(f"malformed JSON at char {base + e.pos}") from None
+            # a value running up to the end of the buffer may be cut short,
+            # e.g. "-1.5e" of "-1.5e10"
+            if _NUM_TAIL.issuperset(buf[end:]) and more():
+                continue
+            pos = end
+            return obj
+
+    if peek() != "[":
+        raise ValueError("orders.json must be a JSON array")
+    pos += 1
+    if peek() == "]":
+        return
+    while True:
+        yield value()
+        c = peek()
+        if c == ",":
+            pos += 1
+            continue
+        if c == "]":
+            return
+        raise ValueError(f"malformed JSON at char {base + pos}: expected ',' or ']'")
+
+
+def read_orders(path: str, quarantine: Quarantine, chunk_size: int = CHUNK_SIZE) -> Iterator[Order]:
+    """Valid orders from an orders.json array, in file order; bad records are quarantined."""
+    with open(path, encoding="utf-8") as f:
+        index = -1
+        try:
+            for index, record in enumerate(iter_array(f, chunk_size)):
+                try:
+                    yield parse_order(record)
+                except InvalidOrder as e:
+                    quarantine.add(os.path.basename(path), str(e), index, record)
+        except ValueError as e:
+            # the rest of the file can't be trusted; keep what was read so far
+            quarantine.add(os.path.basename(path), str(e), index + 1)
@@ -0,0 +1,84 @@
+"""
+Append-only journal of order book deltas.
+
+One JSON object per line, each prefixed with the CRC-32 of its JSON text,
+written after the snapshot it applies to:
+
+    {"op": "base",   "snapshot": <snapshot checksum>}
+    {"op": "add",    "oid": 7, "order": {...order JSON...}}
+    {"op": "fill",   "oid": 7, "amountIn": "...", "amountOut": "..."}
+    {"op": "remove", "oid": 7, "reason": "fill" | "cancel" | "expire" | "unfunded"}
+
+The first line names the snapshot the journal was started on, so a
+journal left behind by an interrupted compaction is recognized as stale.
+Each run appends only what changed; compaction folds the journal back into
+a fresh snapshot (see orderbook.save_book).
+"""
+import json
+import os
+import zlib
+from typing import Iterator, List
+
+
+class CorruptJournalError(ValueError):
+    pass
+
+
+def _line(e: dict) -> str:
+    text = json.dumps(e, separators=(",", ":"))
+    return f"{zlib.crc32(text.encode()):08x} {text}\n"
+
+
+def append(path: str, entries: List[dict], base: int) -> None:
+    """Append entries (durably), starting the journal on snapshot `base` if needed."""
+    if not entries:
+        return
+    lines = "".join(_line(e) for e in entries)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        lines = _line({"op": "base", "snapshot": base}) + lines
+    with open(path, "a") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _check(line: bytes) -> bool:
+    crc, _, text = line.rstrip(b"\n").partition(b" ")
+    try:
+        return line.endswith(b"\n") and int(crc, 16) == zlib.crc32(text)
+    except ValueError:
+        return False
+
+
+def read(path: str) -> Iterator[dict]:
+    """
+    Yield journal entries (the "base" line included), checking every line.
+
+    A bad final line is what a crash in the middle of append() leaves
+    behind; it is dropped and cut off the file so the next append starts
+    clean. A bad line anywhere else raises CorruptJournalError.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as f:
+        offset, prev = 0, None
+        for n, line in enumerate(f, 1):
+            if prev is not None:
+                if not _check(prev):
+                    raise CorruptJournalError(f"{path}: checksum mismatch at line {n - 1}")
+                yield json.loads(prev.partition(b" ")[2])
+                offset += len(prev)
+            prev = line
+        if prev is None:
+            return
+        if _check(prev):
+            yield json.loads(prev.partition(b" ")[2])
+            return
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def truncate(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
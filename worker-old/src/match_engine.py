@@ -1,76 +1,249 @@
-import json, os, time
-from typing import List, Tuple
-from eth_account import Account
-from eth_account.messages import encode_defunct
-
-# --------- helpers ---------
-def to_int(x) -> int:
-    if isinstance(x, int):
-        return x
-    if isinstance(x, str) and x.isdigit():
-        return int(x)
-    return int(float(x))
-
-def load_incoming_orders(path="/iexec_in/orders.json") -> List[dict]:
-    if not os.path.exists(path):
+import heapq, time
+from typing import List, Optional, Tuple, Union
+from eth_utils import to_hex
+import merkle
+from signer import TradeSigner
+from trade_hash import hash_trade
+from order import PRICE_SCALE, Order, ticks_to_price
+from orderbook import Book, Pair, Side, remove_orders
+
+# --------- crossing engine ---------
+class CrossingEngine:
+    """
+    Price-indexed view of one trading pair used to find crossing orders.
+
+    Each side keeps its market and limit orders in separate heaps, so the
+    best order of either kind is read in O(1) and removed in O(log n).
+    Market orders go first (time priority among themselves) and trade
+    against the best limit on the other side; two market orders never
+    meet, as neither carries a price. Limits follow price-time priority.
+    """
+
+    def __init__(self, part: Side):
+        self._seq = 0
+        # side -> (market heap, limit heap)
+        self._heaps = {side: ([], []) for side in ("buy", "sell")}
+        for side in ("buy", "sell"):
+            for o in part[side]:
+                self._heap(o).append(self._entry(o))
+            for h in self._heaps[side]:
+                heapq.heapify(h)
+
+    def _heap(self, o: Order) -> list:
+        return self._heaps[o.side][not o.is_market]
+
+    def _entry(self, o: Order) -> tuple:
+        # (price priority, time priority, insertion order, order)
+        self._seq += 1
+        px = 0 if o.is_market else (-o.price if o.is_buy else o.price)
+        return (px, o.ts or 0, self._seq, o)
+
+    def _top(self, side: str, limit: bool) -> Optional[tuple]:
+        h = self._heaps[side][limit]
+        return h[0] if h else None
+
+    def best_cross(self) -> Optional[Tuple[Order, Order, int]]:
+        """Best crossing (buy, sell, price in ticks) of the pair, or None."""
+        mb, lb = self._top("buy", False), self._top("buy", True)
+        ms, ls = self._top("sell", False), self._top("sell", True)
+        # (market entry, buy, sell): the earliest market order goes first
+        takers = []
+        if mb and ls:
+            takers.append((mb, mb[-1], ls[-1]))
+        if ms and lb:
+            takers.append((ms, lb[-1], ms[-1]))
+        if takers:
+            _, b, s = min(takers, key=lambda t: t[0][1:3])
+        elif lb and ls:
+            b, s = lb[-1], ls[-1]
+        else:
+            return None
+        px = cross_price(b, s)
+        if px is None:
+            return None
+        return b, s, px
+
+    def pop(self, o: Order) -> None:
+        """Remove a filled order (must be the current best of its kind and side)."""
+        heapq.heappop(self._heap(o))
+
+def cross_price(b: Order, s: Order) -> Optional[int]:
+    """Trade price in ticks if b and s cross, else None."""
+    # MARKET vs MARKET — no price to trade at
+    if b.is_market and s.is_market:
+        return None
+
+    # MARKET BUY — immediately execute at best available sell price
+    if b.is_market:
+        return s.price
+
+    # MARKET SELL — immediately execute at best available buy price
+    if s.is_market:
+        return b.price
+
+    # LIMIT vs LIMIT — cross check, midpoint price (rounded down to a tick)
+    if b.price >= s.price:
+        return (b.price + s.price) // 2
+    return None
+
+# --------- partial fills ---------
+def remaining(o: Order) -> int:
+    """Unfilled base quantity of an order (a sell gives base, a buy receives it)."""
+    return o.amount_in if o.is_buy else o.amount_out
+
+def apply_fill(o: Order, base: int) -> int:
+    """
+    Reduce an order by `base` units of base token, in place.
+
+    The quote leg shrinks pro-rata, so the residual keeps the order's
+    original limit ratio. Returns the quote amount taken off the order.
+    """
+    if o.is_buy:
+        quote = o.amount_out * base // o.amount_in if o.amount_in else 0
+        o.amount_in -= base
+        o.amount_out -= quote
+    else:
+        quote = o.amount_in * base // o.amount_out if o.amount_out else 0
+        o.amount_out -= base
+        o.amount_in -= quote
+    return quote
+
+def sweep(book: Book, max_matches: Optional[int] = None,
+          base_decimals: int = 18, quote_decimals: int = 18) -> List[Tuple[Order, Order, float, int, int]]:
+    """
+    Keep matching until nothing crosses (or max_matches is reached).
+
+    Each match fills the smaller side in full and leaves the residual of
+    the larger order resting in the book, still at its own limit ratio.
+    Returns (buy, sell, price, amountBase, amountQuote) per fill, the
+    quote being base at the trade price (as in auction.clear); fully
+    filled orders are removed from their pair's partition in a single pass.
+    """
+    fills = []
+    for pair in list(book):
+        if max_matches is not None and len(fills) >= max_matches:
+            break
+        limit = None if max_matches is None else max_matches - len(fills)
+        fills.extend(sweep_pair(book, pair, limit, base_decimals, quote_decimals))
+    return fills
+
+def sweep_pair(book: Book, pair: Pair, max_matches: Optional[int] = None,
+               base_decimals: int = 18, quote_decimals: int = 18) -> List[Tuple[Order, Order, float, int, int]]:
+    """sweep() restricted to one trading pair's partition."""
+    part = book[pair]
+    if not part["buy"] or not part["sell"]:
         return []
-    with open(path) as f:
-        return json.load(f)
-
-def same_pair(buy: dict, sell: dict) -> bool:
-    # buy: tokenIn = QUOTE, tokenOut = BASE
-    # sell: tokenOut = BASE, tokenIn = QUOTE
-    return (buy["tokenIn"].lower() == sell["tokenIn"].lower() and
-            buy["tokenOut"].lower() == sell["tokenOut"].lower()) or \
-           (buy["tokenIn"].lower() == sell["tokenOut"].lower() and
-            buy["tokenOut"].lower() == sell["tokenIn"].lower())
-
-def try_match(book):
-    if not book["buy"] or not book["sell"]:
-        raise ValueError("book empty")
-
-    for b in book["buy"]:
-        for s in book["sell"]:
-            if not same_pair(b, s):
-                continue
-
-            # MARKET BUY — immediately execute at best available sell price
-            if b.get("orderType") == "market":
-                trade_px = float(s["price"])
-                return b, s, trade_px
-
-            # MARKET SELL — immediately execute at best available buy price
-            if s.get("orderType") == "market":
-                trade_px = float(b["price"])
-                return b, s, trade_px
-
-            # LIMIT vs LIMIT — cross check
-            if float(b["price"]) >= float(s["price"]):
-                trade_px = (float(b["price"]) + float(s["price"])) / 2
-                return b, s, trade_px
-
-    raise ValueError("no crossing quotes")
-
-def build_trade(buy: dict, sell: dict) -> dict:
+
+    # base in base-token units -> quote in quote-token units at a tick price
+    num = 10 ** quote_decimals
+    den = PRICE_SCALE * 10 ** base_decimals
+    engine = CrossingEngine(part)
+    fills = []
+    done = set()
+    while max_matches is None or len(fills) < max_matches:
+        match = engine.best_cross()
+        if match is None:
+            break
+        buy, sell, px = match
+        base = min(remaining(buy), remaining(sell))
+        if base > 0:
+            apply_fill(buy, base)
+            apply_fill(sell, base)
+            fills.append((buy, sell, ticks_to_price(px), base, base * px * num // den))
+        for o in (buy, sell):
+            if remaining(o) <= 0:
+                engine.pop(o)
+                done.add(o)
+            elif base > 0:
+                book.log_fill(o)
+
+    if done:
+        for side in ("buy", "sell"):
+            remove_orders(book, pair, side, done, "fill")
+    return fills
+
+def build_trade(buy: Order, sell: Order, maker: str,
+                amountA: Optional[int] = None, amountB: Optional[int] = None,
+                nonce: Optional[int] = None) -> dict:
     """
-    Build settlement trade (maker = seller of BASE; taker = buyer of BASE)
+    Build settlement trade (taker = buyer of BASE)
+
+    maker is the settlement contract: settle() pays tokenA out of its own
+    balance and requires t.maker == address(this). amountA/amountB are the
+    filled base/quote amounts; when omitted the full sell amountOut and buy
+    amountOut are moved. Runs producing more than one trade should pass
+    distinct nonces (see net_fills).
     """
-    # Here we move the smaller side notional (simple MVP; you can refine partial fills)
-    amountA = to_int(sell["amountOut"])  # base from seller -> buyer
-    amountB = to_int(buy["amountOut"])   # quote from buyer -> seller
+    if amountA is None:
+        amountA = sell.amount_out  # base from seller -> buyer
+    if amountB is None:
+        amountB = buy.amount_out   # quote from buyer -> seller
+    if nonce is None:
+        nonce = int(time.time())
 
     return {
-        "maker": sell["owner"],               # sends tokenA (base)
-        "taker": buy["owner"],                # sends tokenB (quote)
-        "tokenA": sell["tokenOut"],           # base token (e.g., WETHm)
-        "tokenB": buy["tokenOut"],            # quote token (e.g., USDCm)
+        "maker": maker,                       # settlement contract, sends tokenA (base)
+        "taker": buy.owner,                   # sends tokenB (quote)
+        "tokenA": sell.token_out,             # base token (e.g., WETHm)
+        "tokenB": buy.token_out,              # quote token (e.g., USDCm)
         "amountA": str(amountA),
         "amountB": str(amountB),
-        "nonce": int(time.time()),
+        "nonce": nonce,
         "deadline": int(time.time()) + 600
     }
 
-def sign_trade(trade: dict, privkey_hex: str) -> Tuple[str, str]:
-    msg = encode_defunct(text=json.dumps(trade, sort_keys=True))
-    signed = Account.sign_message(msg, private_key=privkey_hex)
-    return signed.signature.hex(), Account.from_key(privkey_hex).address
\ No newline at end of file
+# --------- netting ---------
+def net_fills(fills: List[dict], run_nonce: Optional[int] = None) -> List[dict]:
+    """
+    Merge fills of the same taker and token pair into one net trade, so
+    each taker costs one settle() and two ERC20 transfers per run instead
+    of one per fill. maker (the settlement contract) is part of the key too,
+    so trades meant for different contracts never merge.
+
+    `fills` are {"price", "trade"} entries; the result keeps first-seen
+    order, with amounts summed, price base-weighted and "fills" counting
+    the merged legs. Every trade gets nonce (run_nonce << 32) + index, so
+    two trades with equal amounts never share a hash and the contract's
+    executed[hash] replay guard can't reject a legitimate one. The hash
+    (and signature) is then taken over the net trade itself.
+    """
+    if run_nonce is None:
+        run_nonce = time.time_ns()
+    groups = {}
+    for f in fills:
+        t = f["trade"]
+        key = (t["maker"].lower(), t["taker"].lower(), t["tokenA"].lower(), t["tokenB"].lower())
+        g = groups.get(key)
+        if g is None:
+            groups[key] = {"trade": dict(t), "fills": 1, "_px": f["price"] * int(t["amountA"])}
+            continue
+        net = g["trade"]
+        net["amountA"] = str(int(net["amountA"]) + int(t["amountA"]))
+        net["amountB"] = str(int(net["amountB"]) + int(t["amountB"]))
+        net["deadline"] = min(net["deadline"], t["deadline"])
+        g["fills"] += 1
+        g["_px"] += f["price"] * int(t["amountA"])
+
+    out = []
+    for i, g in enumerate(groups.values()):
+        net = g["trade"]
+        net["nonce"] = (run_nonce << 32) + i
+        base = int(net["amountA"])
+        out.append({"price": g["_px"] / base if base else 0.0, "fills": g["fills"], "trade": net})
+    return out
+
+# --------- batch signing ---------
+
+def sign_batch(trades: List[dict], signer: Union[TradeSigner, str]) -> Tuple[str, str, List[str], List[List[str]]]:
+    """
+    Sign a whole run at once: build a Merkle tree over the trade hashes and
+    sign only its root (settleBatch in DarkPoolSettlement verifies it).
+    Returns (root, signature, hash per trade, proof per trade), hex encoded.
+    """
+    if isinstance(signer, str):
+        signer = TradeSigner(signer)
+    leaves = [hash_trade(t) for t in trades]
+    root, proofs = merkle.build(leaves)
+    return (to_hex(root), signer.sign_hash(root),
+            [to_hex(h) for h in leaves],
+            [[to_hex(p) for p in proof] for proof in proofs])
\ No newline at end of file
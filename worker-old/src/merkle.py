@@ -0,0 +1,40 @@
+"""
+Merkle tree over trade hashes, compatible with OpenZeppelin MerkleProof:
+internal nodes are keccak256 of the sorted (smaller first) child pair, and
+an unpaired node is carried up to the next level unchanged.
+"""
+from typing import List, Tuple
+
+from eth_utils import keccak
+
+
+def _node(a: bytes, b: bytes) -> bytes:
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+def build(leaves: List[bytes]) -> Tuple[bytes, List[List[bytes]]]:
+    """Return (root, proof per leaf) for 32-byte leaves, in leaf order."""
+    if not leaves:
+        raise ValueError("no leaves")
+    proofs: List[List[bytes]] = [[] for _ in leaves]
+    # positions[i] = index of leaf i's ancestor in the current level
+    positions = list(range(len(leaves)))
+    level = list(leaves)
+    while len(level) > 1:
+        nxt = [_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        for leaf, pos in enumerate(positions):
+            sibling = pos ^ 1
+            if sibling < len(level):
+                proofs[leaf].append(level[sibling])
+            positions[leaf] = pos // 2
+        level = nxt
+    return level[0], proofs
+
+
+def verify(proof: List[bytes], root: bytes, leaf: bytes) -> bool:
+    node = leaf
+    for sibling in proof:
+        node = _node(node, sibling)
+    return node == root
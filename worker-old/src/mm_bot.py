@@ -2,11 +2,92 @@
 # iDarkPool – Market Maker Injector v2
 # Mario Canalella – 2025
 
-from typing import Dict
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from mm_strategy import QuotingStrategy
+from order import PRICE_DECIMALS, Order
+from orderbook import Book, Pair, insert_orders, partition, remove_orders
+
+# MM prices are quoted in cents
+_CENT_TICKS = 10 ** (PRICE_DECIMALS - 2)
+
+
+def ladder(
+    ref_price: float,
+    levels: int,
+    spread_bps: float,
+    step_bps: float,
+    size_base,
+    base_decimals: int = 18,
+    quote_decimals: int = 18,
+) -> Tuple[List[int], List[int], List[int], List[int]]:
+    """
+    All levels of a symmetric ladder in one vectorized pass.
+
+    size_base is a scalar or one size per level. Returns
+    (bid ticks, ask ticks, base amounts, quote amounts) as Python ints,
+    level 0 first, so bids come out best-first (descending) and asks
+    best-first (ascending). Levels whose bid would not be a positive price
+    are left out on both sides, so fewer than `levels` may come back.
+    """
+    spread = (spread_bps + np.arange(levels) * step_bps) / 10_000
+    bid_cents = np.rint(ref_price * (1 - spread) * 100).astype(np.int64)
+    # the ladder stops before a bid would reach zero (spread near 100%)
+    levels = int(np.count_nonzero(bid_cents > 0))
+    bid_cents = bid_cents[:levels]
+    ask_cents = np.rint(ref_price * (1 + spread[:levels]) * 100).astype(np.int64)
+    size = np.broadcast_to(np.asarray(size_base, dtype=np.float64), spread.shape)[:levels]
+    base = (size * 10.0 ** base_decimals).astype(object)
+    quote = (size * (ref_price * 10.0 ** quote_decimals)).astype(object)
+    return (
+        [c * _CENT_TICKS for c in bid_cents.tolist()],
+        [c * _CENT_TICKS for c in ask_cents.tolist()],
+        [int(x) for x in base],
+        [int(x) for x in quote],
+    )
+
+
+def _quote_key(o: Order) -> Tuple[int, int, int]:
+    return (o.price, o.amount_in, o.amount_out)
+
+
+def sync_side(book: Book, pair: Pair, side: str, mm_address: str,
+              desired: List[Order]) -> Tuple[int, int]:
+    """
+    Make the MM's resting orders on one side equal `desired`.
+
+    Resting MM orders are matched to desired quotes by (price, size); those
+    stay untouched (keeping their oid and queue position), the rest are
+    cancelled and only the missing quotes are inserted. `desired` must be
+    best-first. Returns (placed, cancelled).
+    """
+    owner = mm_address.lower()
+    want = {}
+    for o in desired:
+        want.setdefault(_quote_key(o), []).append(o)
+
+    matched: Set[Order] = set()
+    stale: Set[Order] = set()
+    for o in partition(book, *pair)[side]:
+        if o.owner.lower() != owner:
+            continue
+        slot = want.get(_quote_key(o))
+        if slot:
+            matched.add(slot.pop())
+        else:
+            stale.add(o)
+
+    cancelled = remove_orders(book, pair, side, stale, "cancel") if stale else 0
+    fresh = [o for o in desired if o not in matched]
+    if fresh:
+        insert_orders(book, pair, side, fresh, presorted=True)
+    return len(fresh), cancelled
 
 
 def inject_mm_quotes(
-    book: Dict[str, list],
+    book: Book,
     ref_price: float,
     mm_address: str,
     base_token: str,      # e.g. WETHm
@@ -18,64 +99,61 @@ def inject_mm_quotes(
     base_decimals: int = 18,
     quote_decimals: int = 18,
     ensure_cross: bool = True,  # guarantee at least one crossing quote
+    strategy: Optional[QuotingStrategy] = None,  # overrides mid/spread/step/size
 ):
     """
-    Injects a layered market maker book around a reference price.
+    Keeps a layered market maker book around a reference price.
 
     - Produces limit BUY (bids) and SELL (asks)
     - Each level widens spread gradually
     - Optionally ensures one crossing bid for demo testing
+    - Diffs against the MM's resting orders: unchanged levels stay, changed
+      or filled ones are replaced, so the MM never has more than
+      levels (+1 crossing bid) orders per side in the book
+    - With a strategy, the ladder is centered and sized by strategy.quote()
     """
+    if strategy is not None:
+        ref_price, spread_bps, step_bps, size_base = strategy.quote(ref_price)
+
+    pair = (base_token.lower(), quote_token.lower())
+    bid_px, ask_px, base_amt, quote_amt = ladder(
+        ref_price, levels, spread_bps, step_bps, size_base, base_decimals, quote_decimals)
 
-    book.setdefault("buy", [])
-    book.setdefault("sell", [])
-
-    for i in range(levels):
-        # widen spread each level
-        spread = (spread_bps + i * step_bps) / 10_000
-        bid_px = ref_price * (1 - spread)
-        ask_px = ref_price * (1 + spread)
-
-        # SELL base (ask) — MM provides base_token and wants quote_token
-        ask = {
-            "owner": mm_address,
-            "side": "sell",
-            "orderType": "limit",
-            "tokenOut": base_token,
-            "tokenIn": quote_token,
-            "amountOut": str(int(size_base * (10 ** base_decimals))),
-            "amountIn": str(int(ref_price * size_base * (10 ** quote_decimals))),
-            "price": round(ask_px, 2),
-            "deadline": 9999999999,
-        }
-
-        # BUY base (bid) — MM provides quote_token and wants base_token
-        bid = {
-            "owner": mm_address,
-            "side": "buy",
-            "orderType": "limit",
-            "tokenOut": quote_token,
-            "tokenIn": base_token,
-            "amountOut": str(int(ref_price * size_base * (10 ** quote_decimals))),
-            "amountIn": str(int(size_base * (10 ** base_decimals))),
-            "price": round(bid_px, 2),
-            "deadline": 9999999999,
-        }
-
-        book["buy"].append(bid)
-        book["sell"].append(ask)
+    # SELL base (ask) — MM provides base_token and wants quote_token
+    asks = [
+        Order(owner=mm_address, side="sell", order_type="limit",
+              token_out=base_token, token_in=quote_token,
+              amount_out=b, amount_in=q, price=px, deadline=9999999999)
+        for px, b, q in zip(ask_px, base_amt, quote_amt)
+    ]
+    # BUY base (bid) — MM provides quote_token and wants base_token
+    bids = [
+        Order(owner=mm_address, side="buy", order_type="limit",
+              token_out=quote_token, token_in=base_token,
+              amount_out=q, amount_in=b, price=px, deadline=9999999999)
+        for px, b, q in zip(bid_px, base_amt, quote_amt)
+    ]
 
     if ensure_cross:
-        book["buy"].append({
-            "owner": mm_address,
-            "side": "buy",
-            "orderType": "limit",
-            "tokenOut": quote_token,
-            "tokenIn": base_token,
-            "amountOut": str(int(ref_price * size_base * (10 ** quote_decimals))),
-            "amountIn": str(int(size_base * (10 ** base_decimals))),
-            "price": round(ref_price * 1.01, 2),  # intentionally 1% above mid
-            "deadline": 9999999999,
-        })
-
-    print(f"📘 Injected {len(book['buy'])} bids / {len(book['sell'])} asks into book")
\ No newline at end of file
+        # intentionally 1% above mid, i.e. ahead of every other bid, and never
+        # below the MM's own best ask (a strategy may quote wider than 1%);
+        # sized like level 0, computed on its own so it also works with levels=0
+        _, _, (cross_base,), (cross_quote,) = ladder(
+            ref_price, 1, 0, 0, float(np.ravel(size_base)[0]), base_decimals, quote_decimals)
+        cross_px = int(np.rint(ref_price * 1.01 * 100)) * _CENT_TICKS
+        if ask_px:
+            cross_px = max(cross_px, ask_px[0])
+        bids.insert(0, Order(
+            owner=mm_address, side="buy", order_type="limit",
+            token_out=quote_token, token_in=base_token,
+            amount_out=cross_quote, amount_in=cross_base,
+            price=cross_px,
+            deadline=9999999999,
+        ))
+
+    placed_b, cancelled_b = sync_side(book, pair, "buy", mm_address, bids)
+    placed_a, cancelled_a = sync_side(book, pair, "sell", mm_address, asks)
+    part = partition(book, *pair)
+
+    print(f"📘 MM quotes: {placed_b + placed_a} placed, {cancelled_b + cancelled_a} cancelled; "
+          f"book has {len(part['buy'])} bids / {len(part['sell'])} asks")
@@ -0,0 +1,170 @@
+"""
+Quoting strategies for the market maker.
+
+A strategy turns the reference price into the ladder parameters used by
+mm_bot.inject_mm_quotes, and is told about every fill of the pair so it can
+adapt:
+
+    strategy = InventorySkewStrategy.load()
+    inject_mm_quotes(book, REF_PRICE, ..., strategy=strategy)
+    ...
+    strategy.on_fill(price, base_delta)     # per fill, after matching
+    strategy.on_run(vwap)                   # once per run that traded the pair
+    strategy.save()
+
+Volatility is measured run to run: fills within one run walk the MM's
+own ladder levels, so their spread says nothing about the market.
+
+State (MM inventory and the rolling fill window) persists next to the
+order book between runs.
+"""
+import json
+import math
+import os
+from collections import deque
+from typing import NamedTuple, Optional, Protocol
+
+STATE_PATH = "/iexec_in/mm_state.json"
+
+
+class Quote(NamedTuple):
+    mid: float
+    spread_bps: float
+    step_bps: float
+    size_base: float
+
+
+class QuotingStrategy(Protocol):
+    def quote(self, ref_price: float) -> Quote: ...
+
+    def on_fill(self, price: float, base_delta: int) -> None: ...
+
+    def on_run(self, vwap: float) -> None: ...
+
+
+class StaticStrategy:
+    """Symmetric fixed ladder around the reference price (the original MM)."""
+
+    def __init__(self, spread_bps: float = 50, step_bps: float = 25, size_base: float = 1.0):
+        self.spread_bps = spread_bps
+        self.step_bps = step_bps
+        self.size_base = size_base
+
+    def quote(self, ref_price: float) -> Quote:
+        return Quote(ref_price, self.spread_bps, self.step_bps, self.size_base)
+
+    def on_fill(self, price: float, base_delta: int) -> None:
+        pass
+
+    def on_run(self, vwap: float) -> None:
+        pass
+
+
+class FillWindow:
+    """
+    Realized volatility over the last `size` run-to-run log returns.
+
+    Running sums are updated as returns enter and leave the window, so
+    both push() and stdev() are O(1).
+    """
+
+    def __init__(self, size: int = 100):
+        self.returns = deque(maxlen=size)
+        self.last_price: Optional[float] = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def push(self, price: float) -> None:
+        if price <= 0:
+            return
+        if self.last_price is not None:
+            self._add(math.log(price / self.last_price))
+        self.last_price = price
+
+    def restore(self, last_price: Optional[float], returns) -> None:
+        self.last_price = last_price
+        for r in returns:
+            self._add(r)
+
+    def _add(self, r: float) -> None:
+        if len(self.returns) == self.returns.maxlen:
+            old = self.returns[0]
+            self._sum -= old
+            self._sumsq -= old * old
+        self.returns.append(r)
+        self._sum += r
+        self._sumsq += r * r
+
+    def stdev(self) -> float:
+        n = len(self.returns)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        return math.sqrt(max(self._sumsq / n - mean * mean, 0.0) * n / (n - 1))
+
+
+class InventorySkewStrategy(StaticStrategy):
+    """
+    Skews the ladder against the MM's inventory and widens it with
+    realized volatility.
+
+    - mid moves down by up to `skew_bps` when long `max_inventory` base
+      (and up when short), so the side that reduces inventory fills first
+    - spread grows by `vol_mult` times the per-run volatility in bps,
+      capped at `max_spread_bps` so the ladder's bids stay well above zero
+    With no inventory and no fill history it quotes like StaticStrategy.
+    """
+
+    def __init__(self, spread_bps: float = 50, step_bps: float = 25, size_base: float = 1.0,
+                 skew_bps: float = 50, max_inventory: float = 10.0, vol_mult: float = 2.0,
+                 window: int = 100, max_spread_bps: float = 5_000, base_decimals: int = 18,
+                 path: Optional[str] = None):
+        super().__init__(spread_bps, step_bps, size_base)
+        self.skew_bps = skew_bps
+        self.max_inventory = max_inventory
+        self.vol_mult = vol_mult
+        self.max_spread_bps = max_spread_bps
+        self.base_unit = 10 ** base_decimals
+        self.inventory = 0            # MM base position, in base token units
+        self.window = FillWindow(window)
+        self.path = path
+
+    def quote(self, ref_price: float) -> Quote:
+        inv = self.inventory / self.base_unit / self.max_inventory
+        skew = max(-1.0, min(1.0, inv)) * self.skew_bps
+        spread = min(self.spread_bps + self.vol_mult * self.window.stdev() * 10_000, self.max_spread_bps)
+        return Quote(ref_price * (1 - skew / 10_000), spread, self.step_bps, self.size_base)
+
+    def on_fill(self, price: float, base_delta: int) -> None:
+        """Record a fill of the pair; base_delta is the MM's change in base (0 if not involved)."""
+        self.inventory += base_delta
+
+    def on_run(self, vwap: float) -> None:
+        """Record the pair's volume-weighted price over one run."""
+        self.window.push(vwap)
+
+    # ---------- persistence ----------
+    @classmethod
+    def load(cls, path: Optional[str] = None, **kwargs) -> "InventorySkewStrategy":
+        path = path or STATE_PATH
+        s = cls(path=path, **kwargs)
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            s.inventory = int(state["inventory"])
+            s.window.restore(state.get("lastPrice"), state.get("returns", []))
+        return s
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path or STATE_PATH
+        state = {
+            "inventory": str(self.inventory),
+            "lastPrice": self.window.last_price,
+            "returns": list(self.window.returns),
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
@@ -0,0 +1,199 @@
+import math
+import re
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+# Prices are held as integer ticks of 10**-PRICE_DECIMALS quote per base,
+# so comparisons and sort keys never touch floats or strings.
+PRICE_DECIMALS = 18
+PRICE_SCALE = 10 ** PRICE_DECIMALS
+
+# JSON keys owned by Order; anything else is carried through in `extra`
+_KNOWN = ("owner", "side", "orderType", "tokenIn", "tokenOut",
+          "amountIn", "amountOut", "price", "deadline", "ts")
+
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+_INTEGER = re.compile(r"-?[0-9]+")
+# largest integer a JSON float still represents exactly
+_MAX_EXACT_FLOAT = 2 ** 53
+# amounts and price ticks are uint256 on chain and in snapshots, timestamps uint64
+_MAX_UINT256 = 2 ** 256
+_MAX_UINT64 = 2 ** 64
+
+
+class InvalidOrder(ValueError):
+    """An incoming order that can't enter the book; the message is the reason."""
+
+
+def to_int(x) -> int:
+    if isinstance(x, int):
+        return x
+    if isinstance(x, str) and x.isdigit():
+        return int(x)
+    return int(float(x))
+
+
+def price_to_ticks(px) -> int:
+    # Decimal(str(...)) keeps the shortest float repr exact, e.g. 2010.0
+    return int(Decimal(str(px)).scaleb(PRICE_DECIMALS))
+
+
+def ticks_to_price(ticks: int) -> float:
+    return ticks / PRICE_SCALE
+
+
+@dataclass(slots=True, eq=False)
+class Order:
+    """
+    A resting order, parsed once from the JSON schema used in orders.json
+    and the persisted book. Amounts are raw token units, price is in ticks.
+    """
+    owner: str
+    side: str                     # "buy" | "sell"
+    token_in: str
+    token_out: str
+    amount_in: int
+    amount_out: int
+    price: int                    # ticks, see PRICE_DECIMALS
+    order_type: Optional[str] = None
+    deadline: Optional[int] = None
+    ts: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+    price_str: bool = False       # price was a JSON string, not a number
+    oid: int = 0                  # book-assigned id (0 = not in a book yet), not part of the JSON
+    pair: Tuple[str, str] = field(init=False, default=("", ""))  # (base, quote), lowercased
+
+    def __post_init__(self):
+        self.side = self.side.lower()
+        if self.side == "sell":
+            self.pair = (self.token_out.lower(), self.token_in.lower())
+        else:
+            self.pair = (self.token_in.lower(), self.token_out.lower())
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side == "buy"
+
+    @property
+    def is_market(self) -> bool:
+        return self.order_type == "market"
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "Order":
+        px = d.get("price", 0)
+        return cls(
+            owner=d["owner"],
+            side=d["side"],
+            token_in=d["tokenIn"],
+            token_out=d["tokenOut"],
+            amount_in=to_int(d.get("amountIn", 0)),
+            amount_out=to_int(d.get("amountOut", 0)),
+            price=price_to_ticks(px),
+            order_type=d.get("orderType"),
+            deadline=d.get("deadline"),
+            ts=d.get("ts"),
+            extra={k: v for k, v in d.items() if k not in _KNOWN},
+            price_str=isinstance(px, str),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"owner": self.owner, "side": self.side}
+        if self.order_type is not None:
+            d["orderType"] = self.order_type
+        d["tokenOut"] = self.token_out
+        d["tokenIn"] = self.token_in
+        d["amountOut"] = str(self.amount_out)
+        d["amountIn"] = str(self.amount_in)
+        px = Decimal(self.price).scaleb(-PRICE_DECIMALS).normalize()
+        d["price"] = format(px, "f") if self.price_str else float(px)
+        if self.deadline is not None:
+            d["deadline"] = self.deadline
+        if self.ts is not None:
+            d["ts"] = self.ts
+        d.update(self.extra)
+        return d
+
+
+def is_address(v: Any) -> bool:
+    return isinstance(v, str) and _ADDRESS.fullmatch(v) is not None
+
+
+def _address(d: Dict[str, Any], key: str) -> str:
+    v = d.get(key)
+    if not is_address(v):
+        raise InvalidOrder(f"{key} is not an address")
+    return v.lower()
+
+
+def _amount(d: Dict[str, Any], key: str) -> int:
+    v = d.get(key)
+    if isinstance(v, bool):
+        v = None
+    if isinstance(v, float) and v.is_integer() and abs(v) <= _MAX_EXACT_FLOAT:
+        v = int(v)
+    if isinstance(v, str) and _INTEGER.fullmatch(v):
+        v = int(v)
+    if not isinstance(v, int):
+        raise InvalidOrder(f"{key} must be an integer amount (use a string for large values)")
+    if not 0 < v < _MAX_UINT256:
+        raise InvalidOrder(f"{key} must be positive and fit in uint256")
+    return v
+
+
+def parse_order(d: Any) -> Order:
+    """
+    Validate and normalize one incoming order (orders.json or protected data).
+
+    Addresses are lowercased, amounts must be exact uint256 integers and
+    prices finite positive numbers of at least one tick (market orders may
+    omit the price). A client-supplied ts is ignored: time priority is
+    stamped by the book when the order is added. Raises InvalidOrder with
+    the reason on the first bad field.
+    """
+    if not isinstance(d, dict):
+        raise InvalidOrder("order is not an object")
+    side = d.get("side")
+    if not isinstance(side, str) or side.lower() not in ("buy", "sell"):
+        raise InvalidOrder("side must be buy|sell")
+    order_type = d.get("orderType")
+    if order_type not in (None, "limit", "market"):
+        raise InvalidOrder("orderType must be limit|market")
+    owner = _address(d, "owner")
+    token_in = _address(d, "tokenIn")
+    token_out = _address(d, "tokenOut")
+    if token_in == token_out:
+        raise InvalidOrder("tokenIn and tokenOut are the same token")
+    amount_in = _amount(d, "amountIn")
+    amount_out = _amount(d, "amountOut")
+
+    px = d.get("price", 0 if order_type == "market" else None)
+    try:
+        value = float(px) if not isinstance(px, bool) else math.nan
+    except (TypeError, ValueError):
+        value = math.nan
+    if not math.isfinite(value) or value < 0 or (value == 0 and order_type != "market"):
+        raise InvalidOrder("price must be a positive number")
+    ticks = price_to_ticks(px)
+    if ticks >= _MAX_UINT256 or (ticks == 0 and order_type != "market"):
+        raise InvalidOrder(f"price must be at least 1e-{PRICE_DECIMALS} and below 2**256 ticks")
+
+    deadline = d.get("deadline")
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, int)
+                                 or not 0 <= deadline < _MAX_UINT64):
+        raise InvalidOrder("deadline must be a unix timestamp")
+
+    return Order(
+        owner=owner,
+        side=side,
+        token_in=token_in,
+        token_out=token_out,
+        amount_in=amount_in,
+        amount_out=amount_out,
+        price=ticks,
+        order_type=order_type,
+        deadline=deadline,
+        extra={k: v for k, v in d.items() if k not in _KNOWN},
+        price_str=isinstance(px, str),
+    )
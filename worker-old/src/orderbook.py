@@ -1,41 +1,339 @@
+import bisect
+import heapq
 import json
 import os
 import time
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-BOOK_PATH = "/iexec_in/orderbook.json"
+import journal
+from intake import Quarantine
+from order import InvalidOrder, Order, parse_order
+from snapshot import Snapshot, pack
 
-def _empty() -> Dict[str, List[dict]]:
+BOOK_PATH = "/iexec_in/orderbook.bin"
+JOURNAL_PATH = "/iexec_in/orderbook.journal"
+BOOK_JSON_PATH = "/iexec_in/orderbook.json"   # debug export / legacy import
+
+# Fold the journal into a new snapshot once it holds more entries than
+# this, or more entries than there are orders in the book.
+COMPACT_MIN_ENTRIES = 1000
+
+
+class CorruptBookError(Exception):
+    """The persisted book exists but cannot be trusted; never trade on it."""
+
+Pair = Tuple[str, str]                  # normalized (base, quote), lowercased
+Side = Dict[str, List[Order]]           # {"buy": [...], "sell": [...]}
+
+class Book(Dict[Pair, Side]):
+    """
+    Pair partitions of the order book, plus the indexes kept alongside them.
+
+    `expiry` is a min-heap of (deadline, seq, order) over every order that
+    has a deadline, so prune_expired only pops what has actually expired.
+    Entries of orders that already left the book are skipped lazily.
+
+    `pending` collects journal entries (adds, fills, removals) made since
+    the book was loaded; save_book appends them to the journal.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expiry: List[Tuple[int, int, Order]] = []
+        self.pending: List[dict] = []
+        self.journal_len = 0          # entries already in the on-disk journal
+        self.snapshot_id = 0          # checksum of the snapshot the journal builds on
+        self._seq = 0
+        orders = [o for part in self.values() for side in ("buy", "sell") for o in part[side]]
+        self.next_oid = max((o.oid for o in orders), default=0) + 1
+        for o in orders:
+            if not o.oid:
+                o.oid = self._new_oid()
+            self._index(o)
+        heapq.heapify(self.expiry)
+
+    def _new_oid(self) -> int:
+        oid, self.next_oid = self.next_oid, self.next_oid + 1
+        return oid
+
+    def _index(self, o: Order) -> None:
+        if o.deadline is not None:
+            self._seq += 1
+            self.expiry.append((o.deadline, self._seq, o))
+
+    def track(self, o: Order) -> None:
+        """Index and journal an order newly inserted into a partition."""
+        if not o.oid:
+            o.oid = self._new_oid()
+        if o.deadline is not None:
+            self._seq += 1
+            heapq.heappush(self.expiry, (o.deadline, self._seq, o))
+        self.pending.append({"op": "add", "oid": o.oid, "order": o.to_json()})
+
+    def log_fill(self, o: Order) -> None:
+        self.pending.append({"op": "fill", "oid": o.oid,
+                             "amountIn": str(o.amount_in), "amountOut": str(o.amount_out)})
+
+    def log_remove(self, o: Order, reason: str) -> None:
+        self.pending.append({"op": "remove", "oid": o.oid, "reason": reason})
+
+def _empty() -> Book:
+    return Book()
+
+def _empty_side() -> Side:
     return {"buy": [], "sell": []}
 
-def load_book() -> Dict[str, List[dict]]:
+def partition(book: Book, base: str, quote: str) -> Side:
+    """Book side lists for one trading pair (created on first use)."""
+    return book.setdefault((base.lower(), quote.lower()), _empty_side())
+
+def _pair_str(pair: Pair) -> str:
+    return f"{pair[0]}/{pair[1]}"
+
+def load_book(quarantine: Optional[Quarantine] = None) -> Book:
+    """
+    Load snapshot + journal tail. Raises CorruptBookError if either fails
+    validation, rather than silently starting from an empty book. A JSON
+    book being migrated drops invalid orders into `quarantine`.
+
+    Every side of the snapshot is decoded up front: the expiry index and
+    journal replay (by oid) need every order anyway, so a lazy
+    per-pair view would not save work on the run's critical path.
+    """
     if os.path.exists(BOOK_PATH):
-        with open(BOOK_PATH) as f:
-            try:
-                return json.load(f)
-            except Exception:
-                return _empty()
+        try:
+            snap = Snapshot.open(BOOK_PATH)
+            book = Book({pair: {"buy": snap.side(pair, "buy"), "sell": snap.side(pair, "sell")}
+                         for pair in snap.directory})
+            book.snapshot_id = snap.checksum
+            _replay(book, journal.read(JOURNAL_PATH))
+        except Exception as e:
+            raise CorruptBookError(f"order book at {BOOK_PATH} is corrupt: {e}") from e
+        return book
+    if os.path.exists(JOURNAL_PATH):
+        raise CorruptBookError(f"journal {JOURNAL_PATH} found without a snapshot")
+    if os.path.exists(BOOK_JSON_PATH):
+        # migrate a book persisted by the JSON-based worker
+        return import_orderbook(quarantine=quarantine)
     return _empty()
 
-def save_book(book: Dict[str, List[dict]]) -> None:
+def _replay(book: Book, entries: Iterable[dict]) -> None:
+    """Apply journal entries on top of a freshly loaded snapshot."""
+    by_oid = {o.oid: o for part in book.values() for side in ("buy", "sell") for o in part[side]}
+    gone = set()
+    n = 0
+    for e in entries:
+        n += 1
+        if e["op"] == "base":
+            if e["snapshot"] != book.snapshot_id:
+                # compaction wrote a new snapshot but died before dropping
+                # the journal: everything in it is already in the snapshot
+                journal.truncate(JOURNAL_PATH)
+                n = 0
+                break
+        elif e["op"] == "add":
+            o = Order.from_json(e["order"])
+            o.oid = e["oid"]
+            book.next_oid = max(book.next_oid, o.oid + 1)
+            insert_orders(book, o.pair, o.side, [o])
+            by_oid[o.oid] = o
+        elif e["op"] == "fill":
+            o = by_oid.get(e["oid"])
+            if o is not None:
+                o.amount_in = int(e["amountIn"])
+                o.amount_out = int(e["amountOut"])
+        elif e["op"] == "remove":
+            o = by_oid.pop(e["oid"], None)
+            if o is not None:
+                gone.add(o)
+    if gone:
+        for part in book.values():
+            for side in ("buy", "sell"):
+                part[side] = [o for o in part[side] if o not in gone]
+    # replayed entries are already on disk
+    book.pending.clear()
+    book.journal_len = n
+
+def save_book(book: Book) -> None:
+    """
+    Persist the book: append this run's deltas to the journal, or compact
+    (write a fresh snapshot and drop the journal) once it has grown enough.
+    """
     os.makedirs(os.path.dirname(BOOK_PATH), exist_ok=True)
-    with open(BOOK_PATH, "w") as f:
-        json.dump(book, f, indent=2)
+    n_orders = sum(len(part["buy"]) + len(part["sell"]) for part in book.values())
+    journal_len = book.journal_len + len(book.pending)
+    if (os.path.exists(BOOK_PATH) and journal_len <= COMPACT_MIN_ENTRIES
+            and journal_len <= n_orders):
+        journal.append(JOURNAL_PATH, book.pending, book.snapshot_id)
+        book.journal_len = journal_len
+    else:
+        compact(book)
+    book.pending.clear()
+
+def compact(book: Book) -> None:
+    """Write the whole book as a new snapshot and start an empty journal."""
+    data = pack(book)
+    _atomic_write(BOOK_PATH, data)
+    journal.truncate(JOURNAL_PATH)
+    book.snapshot_id = Snapshot(data).checksum
+    book.journal_len = 0
+    book.pending.clear()
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write to a temp file, fsync, then rename over `path` (never a torn file)."""
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fd = os.open(d, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def import_orderbook(path: Optional[str] = None, quarantine: Optional[Quarantine] = None) -> Book:
+    """
+    Read a JSON book (pair-keyed or legacy flat buy/sell lists).
+
+    Old workers wrote whatever they were sent (placeholder tokens, the
+    enclave key as the MM owner), so every record is re-validated with
+    parse_order; the ones that fail are dropped, and their index and
+    reason written to `quarantine` when given. A record's own ts is kept, so migrated
+    orders keep their time priority.
+    """
+    path = path or BOOK_JSON_PATH
+    with open(path) as f:
+        try:
+            raw = json.load(f)
+        except Exception as e:
+            raise CorruptBookError(f"order book at {path} is corrupt: {e}") from e
+    if not isinstance(raw, dict):
+        raise CorruptBookError(f"order book at {path} is corrupt: not an object")
+    if isinstance(raw.get("buy"), list) or isinstance(raw.get("sell"), list):
+        # legacy flat book: {"buy": [...], "sell": [...]} across every pair
+        records = raw.get("buy", []) + raw.get("sell", [])
+    else:
+        records = [d for part in raw.values() if isinstance(part, dict)
+                   for side in ("buy", "sell") for d in part.get(side, [])]
+
+    orders = []
+    for i, d in enumerate(records):
+        try:
+            o = parse_order(d)
+        except InvalidOrder as e:
+            if quarantine is not None:
+                # no record: the old MM stored the enclave private key as owner
+                quarantine.add(os.path.basename(path), str(e), i)
+            continue
+        if isinstance(d.get("ts"), int) and not isinstance(d["ts"], bool):
+            o.ts = d["ts"]
+        orders.append(o)
+    book = _empty()
+    add_orders(book, orders)
+    return book
 
-def add_orders(book: Dict[str, List[dict]], incoming: List[dict]) -> None:
+def export_orderbook(path: Optional[str] = None, book: Optional[Book] = None) -> None:
+    """Dump the book (the persisted one by default) as indented JSON for debugging."""
+    path = path or BOOK_JSON_PATH
+    if book is None:
+        book = load_book()
+    out = {_pair_str(pair): {side: [o.to_json() for o in part[side]] for side in ("buy", "sell")}
+           for pair, part in book.items() if part["buy"] or part["sell"]}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(out, f, indent=2)
+
+def add_orders(book: Book, incoming: Iterable[Union[Order, dict]]) -> int:
+    """
+    Add new orders (Orders or raw order dicts) in one batch; returns how many.
+
+    `incoming` is consumed once, so a streaming source (see intake) never
+    has to be materialized. Dicts are validated with order.parse_order and
+    raise InvalidOrder.
+    """
     now = int(time.time())
+    batches: Dict[Tuple[Pair, str], List[Order]] = {}
+    n = 0
     for o in incoming:
-        side = o["side"].lower()
-        assert side in ("buy", "sell"), "order.side must be buy|sell"
-        o.setdefault("ts", now)
-        book[side].append(o)
+        if not isinstance(o, Order):
+            o = parse_order(o)
+        if o.ts is None:
+            o.ts = now
+        batches.setdefault((o.pair, o.side), []).append(o)
+        n += 1
+    for (pair, side), batch in batches.items():
+        insert_orders(book, pair, side, batch)
+    return n
+
+def insert_orders(book: Book, pair: Pair, side: str, batch: List[Order],
+                  presorted: bool = False) -> None:
+    """
+    Insert a batch into an already sorted side, keeping price-time priority.
+
+    Small batches are bisected into place, larger ones merged in one pass;
+    both keep existing orders ahead of new ones at the same key. Pass
+    presorted=True when the batch is already in priority order.
+    """
+    key = _SORT_KEYS[side]
+    if not presorted:
+        batch.sort(key=key)
+    part = partition(book, *pair)
+    book_side = part[side]
+    if len(batch) * 8 < len(book_side):
+        for o in batch:
+            bisect.insort_right(book_side, o, key=key)
+    else:
+        part[side] = list(heapq.merge(book_side, batch, key=key))
+    for o in batch:
+        book.track(o)
 
-def prune_expired(book: Dict[str, List[dict]]) -> None:
+def prune_expired(book: Book) -> int:
+    """
+    Drop orders whose deadline has passed; returns how many were removed.
+
+    Only expired entries are popped from the expiry index and only the
+    partitions they belong to are filtered.
+    """
     now = int(time.time())
-    for side in ("buy", "sell"):
-        book[side] = [o for o in book[side] if o.get("deadline", now+1) >= now]
+    expired: Dict[Tuple[Pair, str], set] = {}
+    while book.expiry and book.expiry[0][0] < now:
+        _, _, o = heapq.heappop(book.expiry)
+        expired.setdefault((o.pair, o.side), set()).add(o)
+
+    removed = 0
+    for (pair, side), gone in expired.items():
+        removed += remove_orders(book, pair, side, gone, "expire")
+    return removed
+
+def remove_orders(book: Book, pair: Pair, side: str, gone: set, reason: str) -> int:
+    """Remove a set of orders from one side of a pair; returns how many were there."""
+    part = book.get(pair)
+    if part is None:
+        return 0
+    kept = []
+    for o in part[side]:
+        if o in gone:
+            book.log_remove(o, reason)
+        else:
+            kept.append(o)
+    removed = len(part[side]) - len(kept)
+    part[side] = kept
+    return removed
+
+def cancel_orders(book: Book, orders: Iterable[Order]) -> int:
+    """Cancel resting orders; returns how many were removed."""
+    by_side: Dict[Tuple[Pair, str], set] = {}
+    for o in orders:
+        by_side.setdefault((o.pair, o.side), set()).add(o)
+    return sum(remove_orders(book, pair, side, gone, "cancel")
+               for (pair, side), gone in by_side.items())
 
-def sort_book(book: Dict[str, List[dict]]) -> None:
-    # Highest bid first; lowest ask first
-    book["buy"].sort(key=lambda x: (float(x["price"]), -x.get("ts", 0)), reverse=True)
-    book["sell"].sort(key=lambda x: (float(x["price"]), x.get("ts", 0)))
\ No newline at end of file
+# Highest bid first; lowest ask first (earlier ts wins at the same price)
+_SORT_KEYS = {
+    "buy": lambda x: (-x.price, x.ts or 0),
+    "sell": lambda x: (x.price, x.ts or 0),
+}
@@ -0,0 +1,122 @@
+"""
+Funding pre-checks run before matching.
+
+settle() pays tokenA out of the settlement contract's own balance and
+pulls tokenB from the taker with transferFrom, so a trade only lands if
+
+    - the contract holds enough of what the sell side gives, and
+    - the buyer holds, and has approved the contract for, what they pay.
+
+Every balance and allowance a run needs is read in one aggregated call
+(Multicall3.aggregate3, or a JSON-RPC batch of eth_calls when the node has
+no Multicall3 deployed, e.g. a bare anvil) pinned to a single block. Values
+are cached until the next block, so repeated checks within a block are free.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_hash.auto import keccak
+from web3.exceptions import Web3RPCError
+
+from order import Order
+from orderbook import Book, remove_orders
+from trade_hash import checksum
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+_BALANCE_OF = keccak(b"balanceOf(address)")[:4]
+_ALLOWANCE = keccak(b"allowance(address,address)")[:4]
+_AGGREGATE3 = keccak(b"aggregate3((address,bool,bytes)[])")[:4]
+
+# ("balance", token, holder) or ("allowance", token, owner, spender)
+Key = Tuple[str, ...]
+
+
+def _calldata(key: Key) -> Tuple[str, bytes]:
+    if key[0] == "balance":
+        return key[1], _BALANCE_OF + encode(["address"], [key[2]])
+    return key[1], _ALLOWANCE + encode(["address", "address"], [key[2], key[3]])
+
+
+class FundingChecker:
+    def __init__(self, w3, settlement_addr: str, multicall_addr: str = MULTICALL3):
+        self.w3 = w3
+        self.settlement = checksum(settlement_addr)
+        self.multicall = checksum(multicall_addr)
+        self._has_multicall: Optional[bool] = None
+        self._block: Optional[int] = None
+        self._cache: Dict[Key, int] = {}
+
+    def needs(self, o: Order) -> Optional[List[Key]]:
+        """Reads that must cover o.amount_out, or None if the order can't be settled at all."""
+        try:
+            token = checksum(o.token_out)
+            if not o.is_buy:
+                return [("balance", token, self.settlement)]
+            owner = checksum(o.owner)
+        except ValueError:
+            return None
+        return [("balance", token, owner), ("allowance", token, owner, self.settlement)]
+
+    def read(self, keys: Iterable[Key]) -> Dict[Key, int]:
+        """Values for all keys as of the latest block; only uncached keys hit the node."""
+        block = self.w3.eth.block_number
+        if block != self._block:
+            self._block = block
+            self._cache = {}
+        keys = list(dict.fromkeys(keys))
+        missing = [k for k in keys if k not in self._cache]
+        if missing:
+            calls = [_calldata(k) for k in missing]
+            if self._has_multicall is None:
+                self._has_multicall = len(self.w3.eth.get_code(self.multicall, block)) > 0
+            raw = self._aggregate(calls, block) if self._has_multicall else self._batch(calls, block)
+            for k, r in zip(missing, raw):
+                # a failed call (not a token, reverted) counts as no funds
+                self._cache[k] = decode(["uint256"], r)[0] if r and len(r) >= 32 else 0
+        return {k: self._cache[k] for k in keys}
+
+    def _aggregate(self, calls: List[Tuple[str, bytes]], block: int) -> List[Optional[bytes]]:
+        data = _AGGREGATE3 + encode(["(address,bool,bytes)[]"], [[(t, True, d) for t, d in calls]])
+        ret = self.w3.eth.call({"to": self.multicall, "data": data}, block)
+        return [r if ok else None for ok, r in decode(["(bool,bytes)[]"], ret)[0]]
+
+    def _batch(self, calls: List[Tuple[str, bytes]], block: int) -> List[Optional[bytes]]:
+        # raw provider batch: web3's batch_requests() raises if any one call
+        # reverts, here a failed call just comes back as None
+        responses = self.w3.provider.make_batch_request(
+            [("eth_call", [{"to": t, "data": "0x" + d.hex()}, hex(block)]) for t, d in calls])
+        if not isinstance(responses, list):
+            raise Web3RPCError(f"batch eth_call failed: {responses.get('error')}", responses)
+        out: List[Optional[bytes]] = []
+        for r in responses:
+            result = r.get("result") if "error" not in r else None
+            out.append(bytes.fromhex(result[2:]) if isinstance(result, str) else None)
+        return out
+
+def drop_unfunded(book: Book, checker: FundingChecker, exempt: Optional[str] = None) -> int:
+    """
+    Remove orders that could not settle; returns how many were dropped.
+
+    Sides are walked in price-time priority and each order reserves its
+    amount from the shared balance/allowance, so once a payer runs out the
+    orders behind it are dropped rather than over-committed. Orders owned
+    by `exempt` (the worker's own MM) are neither checked nor counted.
+    """
+    exempt = exempt.lower() if exempt else None
+    resting = [(pair, side, o) for pair, part in book.items()
+               for side in ("buy", "sell") for o in part[side]
+               if o.owner.lower() != exempt]
+    needs = [checker.needs(o) for _, _, o in resting]
+    budget = checker.read(k for keys in needs if keys for k in keys)
+
+    gone: Dict[Tuple[Tuple[str, str], str], set] = {}
+    for (pair, side, o), keys in zip(resting, needs):
+        if keys is None or any(budget[k] < o.amount_out for k in keys):
+            gone.setdefault((pair, side), set()).add(o)
+            continue
+        for k in keys:
+            budget[k] -= o.amount_out
+
+    return sum(remove_orders(book, pair, side, orders, "unfunded")
+               for (pair, side), orders in gone.items())
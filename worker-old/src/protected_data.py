@@ -1,39 +1,201 @@
 # dataprotector deserializer module
+import glob
 import os
+import struct
 import zipfile
-from borsh_construct import String, I128, F64, Bool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from borsh_construct import CStruct, String, I128, F64, Bool
 
+from order import Order, parse_order
 
-def getValue(path: str, schema: str):
-    file_path = path.replace('.', '/')
-    IEXEC_IN = os.getenv('IEXEC_IN')
-    IEXEC_DATASET_FILENAME = os.getenv('IEXEC_DATASET_FILENAME')
+_DECODERS = {
+    'bool': Bool,
+    'f64': F64,
+    'i128': I128,
+    'string': String,
+}
 
-    if IEXEC_DATASET_FILENAME == None:
-        raise Exception('Missing protected data')
+# encoded size of fixed-width schemas; strings are u32 length + utf-8 bytes
+_SIZES = {'bool': Bool.sizeof(), 'f64': F64.sizeof(), 'i128': I128.sizeof()}
 
-    dataset_file_path = os.path.join(IEXEC_IN, IEXEC_DATASET_FILENAME)
 
-    file_bytes: bytes
-    try:
-        # Open the ZIP archive
-        with zipfile.ZipFile(dataset_file_path, 'r') as zipf:
-            # Read the file from the ZIP archive as bytes
-            with zipf.open(file_path) as file:
-                file_bytes = file.read()
-    except:
-        raise Exception(f"Failed to load path {path}")
+class ProtectedData:
+    """
+    One protected dataset, opened once.
+
+    The ZIP central directory is parsed when the reader is created and
+    member names are indexed, so a lookup is a dict hit; decoded values are
+    memoized per (path, schema).
+    """
+
+    def __init__(self, dataset_file_path: str):
+        self.path = dataset_file_path
+        try:
+            self._zip = zipfile.ZipFile(dataset_file_path, 'r')
+        except (OSError, zipfile.BadZipFile):
+            raise Exception(f"Failed to open protected data {dataset_file_path}")
+        self._members: Dict[str, zipfile.ZipInfo] = {
+            info.filename: info for info in self._zip.infolist() if not info.is_dir()
+        }
+        self._values: Dict[Tuple[str, str], object] = {}
+
+    @classmethod
+    def from_env(cls) -> 'ProtectedData':
+        IEXEC_IN = os.getenv('IEXEC_IN')
+        IEXEC_DATASET_FILENAME = os.getenv('IEXEC_DATASET_FILENAME')
+        if IEXEC_DATASET_FILENAME == None:
+            raise Exception('Missing protected data')
+        return cls(os.path.join(IEXEC_IN, IEXEC_DATASET_FILENAME))
+
+    def __contains__(self, path: str) -> bool:
+        return path.replace('.', '/') in self._members
+
+    def raw(self, path: str) -> bytes:
+        info = self._members.get(path.replace('.', '/'))
+        if info is None:
+            raise Exception(f"Failed to load path {path}")
+        return self._zip.read(info)
+
+    def get(self, path: str, schema: str):
+        key = (path, schema)
+        if key not in self._values:
+            self._values[key] = decode(path, self.raw(path), schema)
+        return self._values[key]
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """(dotted path, raw bytes) for every member, in archive order."""
+        for info in sorted(self._members.values(), key=lambda i: i.header_offset):
+            yield info.filename.replace('/', '.'), self._zip.read(info)
 
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> 'ProtectedData':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def decode(path: str, file_bytes: bytes, schema: str):
+    decoder = _DECODERS.get(schema)
+    if decoder is None:
+        return file_bytes
     try:
-        if schema == 'bool':
-            return Bool.parse(file_bytes)
-        if schema == 'f64':
-            return F64.parse(file_bytes)
-        if schema == 'i128':
-            return I128.parse(file_bytes)
-        if schema == 'string':
-            return String.parse(file_bytes)
-    except:
+        return decoder.parse(file_bytes)
+    except Exception:
         raise Exception(f"Failed to deserialize \"{path}\" as \"{schema}\"")
 
-    return file_bytes
+
+class Schema:
+    """
+    A set of (path, schema) fields decoded together.
+
+    The fields are compiled once into a single CStruct; decoding a dataset
+    joins the raw members in field order and parses them in one call.
+    Member sizes are checked first so a malformed field is reported by
+    name instead of shifting every field after it.
+    """
+
+    def __init__(self, *fields: Tuple[str, str]):
+        self.fields = fields
+        self._struct = CStruct(*(f"f{i}" / _DECODERS[schema] for i, (_, schema) in enumerate(fields)))
+
+    def parse(self, data: ProtectedData) -> Dict[str, object]:
+        parts = [data.raw(path) for path, _ in self.fields]
+        for (path, schema), raw in zip(self.fields, parts):
+            size = _SIZES.get(schema)
+            if size is None:
+                size = 4 + struct.unpack_from('<I', raw)[0] if len(raw) >= 4 else -1
+            if len(raw) != size:
+                raise Exception(f"Failed to deserialize \"{path}\" as \"{schema}\"")
+        values = self._struct.parse(b''.join(parts))
+        return {path: values[f"f{i}"] for i, (path, _) in enumerate(self.fields)}
+
+
+# a protected order, as written by the dataprotector client
+ORDER_SCHEMA = Schema(
+    ('side', 'string'),
+    ('tokenIn', 'string'),
+    ('tokenOut', 'string'),
+    ('amountIn', 'i128'),
+    ('amountOut', 'i128'),
+    ('price', 'f64'),
+    ('deadline', 'i128'),
+)
+# decoded when present
+ORDER_OPTIONAL = (('owner', 'string'), ('orderType', 'string'))
+
+
+def read_order(data: ProtectedData) -> dict:
+    """Decode a protected order into the orders.json shape add_orders takes."""
+    order = ORDER_SCHEMA.parse(data)
+    order['amountIn'] = str(order['amountIn'])
+    order['amountOut'] = str(order['amountOut'])
+    for path, schema in ORDER_OPTIONAL:
+        if path in data:
+            order[path] = data.get(path, schema)
+    return order
+
+
+def dataset_paths(iexec_in: Optional[str] = None) -> List[str]:
+    """
+    Protected datasets of this task.
+
+    A bulk task lists them as IEXEC_DATASET_<i>_FILENAME for i in
+    1..IEXEC_BULK_SLICE_SIZE; a single-dataset task sets
+    IEXEC_DATASET_FILENAME; outside iExec every *.zip in IEXEC_IN is taken.
+    """
+    iexec_in = iexec_in or os.getenv('IEXEC_IN', '.')
+    bulk = int(os.getenv('IEXEC_BULK_SLICE_SIZE') or 0)
+    if bulk:
+        names = [os.getenv(f'IEXEC_DATASET_{i}_FILENAME') for i in range(1, bulk + 1)]
+        return [os.path.join(iexec_in, n) for n in names if n]
+    single = os.getenv('IEXEC_DATASET_FILENAME')
+    if single:
+        return [os.path.join(iexec_in, single)]
+    return sorted(glob.glob(os.path.join(iexec_in, '*.zip')))
+
+
+def _load(path: str) -> Order:
+    with ProtectedData(path) as data:
+        return parse_order(read_order(data))
+
+
+def load_orders(paths: List[str], workers: int = 8) -> Tuple[List[Order], List[Tuple[str, str]]]:
+    """
+    Decode and validate many protected orders on a bounded thread pool.
+
+    Returns (orders in path order, [(path, reason)] for datasets that could
+    not be read or failed validation).
+    """
+    orders: List[Order] = []
+    rejected: List[Tuple[str, str]] = []
+    if not paths:
+        return orders, rejected
+
+    def attempt(path: str):
+        try:
+            return _load(path), None
+        except Exception as e:
+            return None, str(e)
+
+    with ThreadPoolExecutor(max(1, min(workers, len(paths)))) as pool:
+        for path, (order, reason) in zip(paths, pool.map(attempt, paths)):
+            if order is None:
+                rejected.append((path, reason))
+            else:
+                orders.append(order)
+    return orders, rejected
+
+
+_reader: Optional[ProtectedData] = None
+
+
+def getValue(path: str, schema: str):
+    # the dataset named by the environment is opened once per process
+    global _reader
+    if _reader is None:
+        _reader = ProtectedData.from_env()
+    return _reader.get(path, schema)
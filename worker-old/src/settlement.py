@@ -0,0 +1,159 @@
+"""
+Settlement submitter for signed trades.
+
+Sends many settle() / settleBatch() calls back-to-back from one account:
+nonces are tracked locally (one eth_getTransactionCount per session),
+fees are estimated once per block and reused, and receipts are polled
+concurrently once everything is in the mempool.
+
+Works against any JSON-RPC node, e.g. a local anvil:
+
+    w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+    sub = SettlementSubmitter(w3, settlement, TAKER_PRIV)
+    receipts = sub.wait_all(sub.settle_many(signed_trades))
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eth_account import Account
+from web3.exceptions import TransactionNotFound
+
+from trade_hash import trade_tuple
+
+# settleBatch is not in the compiled ABI shipped in abi/ yet; calls go
+# through this fragment, bound to the settlement contract's address
+_TRADE = [{"name": n, "type": t} for n, t in (
+    ("maker", "address"), ("taker", "address"), ("tokenA", "address"), ("tokenB", "address"),
+    ("amountA", "uint256"), ("amountB", "uint256"), ("nonce", "uint256"), ("deadline", "uint256"))]
+SETTLE_BATCH_ABI = [{
+    "type": "function", "name": "settleBatch", "stateMutability": "nonpayable", "outputs": [],
+    "inputs": [
+        {"name": "trades", "type": "tuple[]", "components": _TRADE},
+        {"name": "proofs", "type": "bytes32[][]"},
+        {"name": "root", "type": "bytes32"},
+        {"name": "signature", "type": "bytes"},
+    ],
+}]
+
+
+def _sig_bytes(sig) -> bytes:
+    if isinstance(sig, bytes):
+        return sig
+    return bytes.fromhex(sig[2:] if sig.startswith("0x") else sig)
+
+
+class SettlementSubmitter:
+    def __init__(self, w3, settlement, privkey_hex: str, chain_id: Optional[int] = None,
+                 gas: int = 800_000, priority_fee_gwei: int = 1, receipt_workers: int = 8):
+        self.w3 = w3
+        self.settlement = settlement
+        self.account = Account.from_key(privkey_hex)
+        self.chain_id = chain_id if chain_id is not None else w3.eth.chain_id
+        self.gas = gas
+        self.priority_fee = w3.to_wei(priority_fee_gwei, "gwei")
+        self.receipt_workers = receipt_workers
+        self._nonce: Optional[int] = None
+        self._fee_block: Optional[int] = None
+        self._fees: Dict[str, int] = {}
+
+    # ---------- nonce / fees ----------
+    def _next_nonce(self) -> int:
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.account.address, "pending")
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    def reset_nonce(self) -> None:
+        """Re-read the nonce from the node on next send (after a failed send)."""
+        self._nonce = None
+
+    def fees(self, block: Optional[dict] = None) -> Dict[str, int]:
+        """EIP-1559 fee fields, recomputed only when a new block is seen."""
+        if block is None:
+            number = self.w3.eth.block_number
+            if number == self._fee_block:
+                return self._fees
+            block = self.w3.eth.get_block(number)
+        if block["number"] != self._fee_block:
+            self._fee_block = block["number"]
+            self._fees = {
+                "maxFeePerGas": block["baseFeePerGas"] * 2 + self.priority_fee,
+                "maxPriorityFeePerGas": self.priority_fee,
+            }
+        return self._fees
+
+    # ---------- sending ----------
+    def send(self, fn, fees: Optional[Dict[str, int]] = None) -> bytes:
+        """Sign and send a contract call with the next local nonce; returns the tx hash."""
+        if fees is None:
+            fees = self.fees()
+        tx = fn.build_transaction({
+            "from": self.account.address,
+            "nonce": self._next_nonce(),
+            "gas": self.gas,
+            "chainId": self.chain_id,
+            **fees,
+        })
+        signed = self.account.sign_transaction(tx)
+        try:
+            return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception:
+            self.reset_nonce()
+            raise
+
+    def settle_many(self, signed_trades: Iterable[Tuple[dict, str]]) -> List[bytes]:
+        """Send settle(trade, signature) for each item without waiting in between."""
+        fees = self.fees()
+        return [
+            self.send(self.settlement.functions.settle(trade_tuple(trade), _sig_bytes(sig)), fees)
+            for trade, sig in signed_trades
+        ]
+
+    def settle_batch(self, trades: List[dict], proofs: List[List[str]], root: str, signature: str,
+                     chunk: int = 20) -> List[bytes]:
+        """Send settleBatch() for a Merkle-signed run, `chunk` trades per transaction."""
+        fees = self.fees()
+        batch = self.w3.eth.contract(address=self.settlement.address, abi=SETTLE_BATCH_ABI)
+        root_b = _sig_bytes(root)
+        sig_b = _sig_bytes(signature)
+        hashes = []
+        for i in range(0, len(trades), chunk):
+            fn = batch.functions.settleBatch(
+                [trade_tuple(t) for t in trades[i:i + chunk]],
+                [[_sig_bytes(p) for p in proof] for proof in proofs[i:i + chunk]],
+                root_b,
+                sig_b,
+            )
+            hashes.append(self.send(fn, fees))
+        return hashes
+
+    # ---------- receipts ----------
+    def _receipt(self, tx_hash: bytes):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def wait_all(self, tx_hashes: List[bytes], timeout: float = 60, poll: float = 0.5) -> list:
+        """Receipts for every hash, in input order; polls the pending ones concurrently."""
+        receipts = [None] * len(tx_hashes)
+        pending = list(range(len(tx_hashes)))
+        deadline = time.time() + timeout
+        with ThreadPoolExecutor(self.receipt_workers) as pool:
+            while pending:
+                found = pool.map(self._receipt, [tx_hashes[i] for i in pending])
+                still = []
+                for i, r in zip(pending, found):
+                    if r is None:
+                        still.append(i)
+                    else:
+                        receipts[i] = r
+                pending = still
+                if not pending:
+                    break
+                if time.time() > deadline:
+                    raise TimeoutError(f"{len(pending)} transaction(s) not mined after {timeout}s")
+                time.sleep(poll)
+        return receipts
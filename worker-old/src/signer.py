@@ -0,0 +1,64 @@
+"""
+Enclave signing stage.
+
+The key is parsed and the enclave address derived once per run. Large
+runs fan the ECDSA work out to a pool of worker processes (each loads the
+key once in its initializer); results always come back in input order so
+result.json stays deterministic.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from eth_account import Account
+from eth_utils import to_hex
+
+from trade_hash import eth_signed_hash, hash_trade
+
+# below this many signatures the pool start-up costs more than it saves
+MIN_PARALLEL = 256
+
+_account = None     # per-worker account, set by _init_worker
+
+
+def _init_worker(privkey_hex: str) -> None:
+    global _account
+    _account = Account.from_key(privkey_hex)
+
+
+def _sign_chunk(hashes: List[bytes]) -> List[str]:
+    return [to_hex(_account.unsafe_sign_hash(eth_signed_hash(h)).signature) for h in hashes]
+
+
+class TradeSigner:
+    """Signs trade hashes (or a batch root) with the enclave key."""
+
+    def __init__(self, privkey_hex: str, workers: Optional[int] = None, processes: bool = True):
+        self._privkey = privkey_hex
+        self._account = Account.from_key(privkey_hex)
+        self.address = self._account.address
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.processes = processes
+
+    def sign_hash(self, h: bytes) -> str:
+        """Signature over eth_signed_hash(h), as the contract recovers it."""
+        return to_hex(self._account.unsafe_sign_hash(eth_signed_hash(h)).signature)
+
+    def sign_hashes(self, hashes: List[bytes]) -> List[str]:
+        if self.workers <= 1 or len(hashes) < MIN_PARALLEL:
+            return [self.sign_hash(h) for h in hashes]
+
+        n = min(self.workers, len(hashes))
+        size = -(-len(hashes) // n)
+        chunks = [hashes[i:i + size] for i in range(0, len(hashes), size)]
+        with self._pool(n) as pool:
+            # map() yields chunk results in submission order
+            return [sig for chunk in pool.map(_sign_chunk, chunks) for sig in chunk]
+
+    def sign_trades(self, trades: List[dict]) -> List[str]:
+        return self.sign_hashes([hash_trade(t) for t in trades])
+
+    def _pool(self, n: int) -> Executor:
+        if self.processes:
+            return ProcessPoolExecutor(n, initializer=_init_worker, initargs=(self._privkey,))
+        return ThreadPoolExecutor(n, initializer=_init_worker, initargs=(self._privkey,))
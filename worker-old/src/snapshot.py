@@ -0,0 +1,182 @@
+"""
+Binary order book snapshot.
+
+Fixed-width, columnar-by-pair layout that can be memory-mapped and decoded
+lazily, one pair (or one record) at a time:
+
+    header | pair directory | order records | string table
+
+The header carries a format version and a CRC-32 of everything after it,
+checked when the snapshot is opened.
+
+Owners, tokens, order types and the JSON of any extra order fields are
+interned in the string table, so each order record is a fixed 144 bytes.
+Amounts and price ticks are stored as 256-bit unsigned integers.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from order import Order
+
+MAGIC = b"IDPB"
+VERSION = 3
+
+# magic, version, n_pairs, n_orders, n_strings, strings offset, crc32 of the body
+_HEADER = struct.Struct("<4sHxxIIIQI4x")
+# base idx, quote idx, n_buy, n_sell
+_PAIR = struct.Struct("<IIII")
+# owner, tokenIn, tokenOut, orderType, extra, flags,
+# amountIn, amountOut, price, deadline, ts, oid
+_RECORD = struct.Struct("<IIIIIB32s32s32sQQQ3x")
+_LEN = struct.Struct("<I")
+
+NONE = 0xFFFFFFFF
+
+F_SELL = 1
+F_PRICE_STR = 2
+F_DEADLINE = 4
+F_TS = 8
+
+Pair = Tuple[str, str]
+
+
+class _Strings:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.items: List[str] = []
+
+    def __call__(self, s: Optional[str]) -> int:
+        if s is None:
+            return NONE
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.items)
+            self.items.append(s)
+        return i
+
+
+def _u256(x: int) -> bytes:
+    return x.to_bytes(32, "little")
+
+
+def pack(book: Dict[Pair, Dict[str, List[Order]]]) -> bytes:
+    """Serialize pair partitions (sides kept in book order) to snapshot bytes."""
+    strings = _Strings()
+    pairs, records = [], []
+    for (base, quote), part in book.items():
+        if not part["buy"] and not part["sell"]:
+            continue
+        pairs.append(_PAIR.pack(strings(base), strings(quote), len(part["buy"]), len(part["sell"])))
+        for o in part["buy"] + part["sell"]:
+            flags = (F_SELL if not o.is_buy else 0) | (F_PRICE_STR if o.price_str else 0)
+            if o.deadline is not None:
+                flags |= F_DEADLINE
+            if o.ts is not None:
+                flags |= F_TS
+            records.append(_RECORD.pack(
+                strings(o.owner), strings(o.token_in), strings(o.token_out),
+                strings(o.order_type),
+                strings(json.dumps(o.extra, sort_keys=True)) if o.extra else NONE,
+                flags,
+                _u256(o.amount_in), _u256(o.amount_out), _u256(o.price),
+                int(o.deadline or 0), int(o.ts or 0), o.oid,
+            ))
+
+    strtab = b"".join(_LEN.pack(len(b)) + b for b in (s.encode() for s in strings.items))
+    body = b"".join([*pairs, *records, strtab])
+    str_off = _HEADER.size + len(body) - len(strtab)
+    header = _HEADER.pack(MAGIC, VERSION, len(pairs), len(records), len(strings.items),
+                          str_off, zlib.crc32(body))
+    return header + body
+
+
+class Snapshot:
+    """
+    Read-only view over a snapshot file or buffer.
+
+    Nothing is decoded up front except the header, the pair directory
+    and the string table; orders are unpacked on access.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        if len(buf) < _HEADER.size:
+            raise ValueError("truncated snapshot header")
+        magic, version, n_pairs, n_orders, n_strings, str_off, self.checksum = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not an order book snapshot")
+        if version != VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        header = _HEADER.size
+        if zlib.crc32(memoryview(buf)[header:]) != self.checksum:
+            raise ValueError("snapshot checksum mismatch")
+        self.n_orders = n_orders
+
+        self._strings: List[str] = []
+        off = str_off
+        for _ in range(n_strings):
+            (n,) = _LEN.unpack_from(buf, off)
+            off += _LEN.size
+            self._strings.append(bytes(buf[off:off + n]).decode())
+            off += n
+
+        self._records = header + _PAIR.size * n_pairs
+        # pair -> (first record, n_buy, n_sell)
+        self.directory: Dict[Pair, Tuple[int, int, int]] = {}
+        first = 0
+        for base, quote, n_buy, n_sell in _PAIR.iter_unpack(
+                buf[header:self._records]):
+            self.directory[(self._strings[base], self._strings[quote])] = (first, n_buy, n_sell)
+            first += n_buy + n_sell
+
+    @classmethod
+    def open(cls, path: str) -> "Snapshot":
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("empty snapshot")
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _str(self, i: int) -> Optional[str]:
+        return None if i == NONE else self._strings[i]
+
+    def order(self, i: int) -> Order:
+        """Decode the i-th order record."""
+        return self._decode(_RECORD.unpack_from(self._buf, self._records + i * _RECORD.size))
+
+    def _decode(self, rec) -> Order:
+        owner, t_in, t_out, o_type, extra, flags, a_in, a_out, px, deadline, ts, oid = rec
+        return Order(
+            owner=self._strings[owner],
+            side="sell" if flags & F_SELL else "buy",
+            token_in=self._strings[t_in],
+            token_out=self._strings[t_out],
+            amount_in=int.from_bytes(a_in, "little"),
+            amount_out=int.from_bytes(a_out, "little"),
+            price=int.from_bytes(px, "little"),
+            order_type=self._str(o_type),
+            deadline=deadline if flags & F_DEADLINE else None,
+            ts=ts if flags & F_TS else None,
+            extra=json.loads(self._strings[extra]) if extra != NONE else {},
+            price_str=bool(flags & F_PRICE_STR),
+            oid=oid,
+        )
+
+    def _range(self, first: int, n: int) -> Iterator[Order]:
+        size = _RECORD.size
+        start = self._records + first * size
+        view = memoryview(self._buf)[start:start + n * size]
+        for rec in _RECORD.iter_unpack(view):
+            yield self._decode(rec)
+
+    def side(self, pair: Pair, side: str) -> List[Order]:
+        """Decode one side of one pair, in stored (sorted) order."""
+        if pair not in self.directory:
+            return []
+        first, n_buy, n_sell = self.directory[pair]
+        if side == "buy":
+            return list(self._range(first, n_buy))
+        return list(self._range(first + n_buy, n_sell))
@@ -0,0 +1,58 @@
+"""
+Trade hashing exactly as DarkPoolSettlement verifies it:
+
+    hash      = keccak256(abi.encode(maker, taker, tokenA, tokenB,
+                                     amountA, amountB, nonce, deadline))
+    ethSigned = keccak256("\\x19Ethereum Signed Message:\\n32" ‖ hash)
+
+The ABI encoder for the Trade tuple is built once, addresses are
+checksummed through a cache and the message prefix is absorbed into a
+keccak state once and copied per trade.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+from eth_abi.registry import registry
+from eth_hash.auto import keccak
+from eth_utils import to_checksum_address
+
+TRADE_FIELDS = ("maker", "taker", "tokenA", "tokenB", "amountA", "amountB", "nonce", "deadline")
+TRADE_ABI = "(address,address,address,address,uint256,uint256,uint256,uint256)"
+
+_encode = registry.get_encoder(TRADE_ABI)
+_ETH_PREFIX = keccak.new(b"\x19Ethereum Signed Message:\n32")
+
+
+@lru_cache(maxsize=4096)
+def checksum(address: str) -> str:
+    return to_checksum_address(address)
+
+
+def trade_tuple(trade: dict) -> Tuple:
+    """Trade dict (addresses in any case, amounts as str/int) -> ABI tuple."""
+    return (
+        checksum(trade["maker"]),
+        checksum(trade["taker"]),
+        checksum(trade["tokenA"]),
+        checksum(trade["tokenB"]),
+        int(trade["amountA"]),
+        int(trade["amountB"]),
+        int(trade["nonce"]),
+        int(trade["deadline"]),
+    )
+
+
+def encode_trade(trade: dict) -> bytes:
+    return _encode(trade_tuple(trade))
+
+
+def hash_trade(trade: dict) -> bytes:
+    """DarkPoolSettlement._hashTrade(t)."""
+    return keccak(_encode(trade_tuple(trade)))
+
+
+def eth_signed_hash(h: bytes) -> bytes:
+    """The digest ECDSA.recover checks in settle()/settleBatch()."""
+    state = _ETH_PREFIX.copy()
+    state.update(h)
+    return state.digest()
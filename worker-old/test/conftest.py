@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# end-to-end scripts against a local anvil, run by hand
+collect_ignore = ["test.py", "test_two_wallet.py", "test_batch_settle.py", "test_merkle_settle.py"]
+
+BASE = "0x" + "aa" * 20
+QUOTE = "0x" + "bb" * 20
+ALICE = "0x" + "11" * 20
+BOB = "0x" + "22" * 20
+
+
+def order_json(side="buy", price=2000, base=10, quote=None, owner=ALICE, **kw) -> dict:
+    """An orders.json record trading `base` units of BASE for QUOTE at `price`."""
+    quote = max(1, int(base * float(price))) if quote is None else quote
+    if side == "buy":
+        d = {"tokenIn": BASE, "tokenOut": QUOTE, "amountIn": str(base), "amountOut": str(quote)}
+    else:
+        d = {"tokenIn": QUOTE, "tokenOut": BASE, "amountIn": str(quote), "amountOut": str(base)}
+    d.update(owner=owner, side=side, price=price, **kw)
+    return d
+
+
+@pytest.fixture
+def book_paths(tmp_path, monkeypatch):
+    """Point the persisted book at a temp dir."""
+    import orderbook
+    monkeypatch.setattr(orderbook, "BOOK_PATH", str(tmp_path / "orderbook.bin"))
+    monkeypatch.setattr(orderbook, "JOURNAL_PATH", str(tmp_path / "orderbook.journal"))
+    monkeypatch.setattr(orderbook, "BOOK_JSON_PATH", str(tmp_path / "orderbook.json"))
+    return tmp_path
@@ -1,11 +1,14 @@
 import json
 import os
+import sys
 import time
 from dotenv import load_dotenv
 from web3 import Web3
 from eth_account import Account
 from eth_account.messages import encode_defunct
-from eth_abi import encode as abi_encode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from trade_hash import hash_trade
 
 # -------------------------------------------------
 # 1️⃣  Load configuration
@@ -94,11 +97,7 @@ def build_trade():
         "deadline": int(time.time()) + 600
     }
 
-    payload = abi_encode(
-        ["address","address","address","address","uint256","uint256","uint256","uint256"],
-        [trade[k] for k in ["maker","taker","tokenA","tokenB","amountA","amountB","nonce","deadline"]]
-    )
-    trade_hash = Web3.keccak(payload)          # matches abi.encode in Solidity
+    trade_hash = hash_trade(trade)             # matches abi.encode in Solidity
     message = encode_defunct(primitive=trade_hash)
     signed = Account.sign_message(message, private_key=PRIVATE_KEY)
     print("🧾 Trade hash:", trade_hash.hex())
@@ -0,0 +1,60 @@
+from auction import clear, clearing_price
+from conftest import ALICE, BASE, BOB, QUOTE, order_json
+from order import PRICE_SCALE, parse_order
+from orderbook import Book, add_orders
+
+PAIR = (BASE, QUOTE)
+
+
+def orders(*specs):
+    return [parse_order(order_json(side, price, base)) for side, price, base in specs]
+
+
+def ticks(price):
+    return price * PRICE_SCALE
+
+
+def test_no_cross():
+    assert clearing_price(orders(("buy", 99, 5)), orders(("sell", 100, 5))) is None
+
+
+def test_max_volume_price():
+    bids = orders(("buy", 103, 5), ("buy", 101, 5), ("buy", 99, 5))
+    asks = orders(("sell", 98, 4), ("sell", 100, 4), ("sell", 102, 4))
+    # 100 and 101 both execute min(10, 8) = 8, every other price less
+    assert clearing_price(bids, asks) == ticks(100) + PRICE_SCALE // 2
+
+
+def test_tie_takes_midpoint_of_tied_range():
+    bids = orders(("buy", 110, 5))
+    asks = orders(("sell", 90, 5))
+    # every price in [90, 110] clears 5 with no imbalance
+    assert clearing_price(bids, asks) == ticks(100)
+
+
+def test_volumes_are_exact_integers():
+    big = 2**200
+    bids = orders(("buy", 102, big + 1))
+    asks = orders(("sell", 100, big), ("sell", 101, 1))
+    # 100 clears one unit less than 101/102; in float64 all three would tie
+    assert clearing_price(bids, asks) == ticks(101) + PRICE_SCALE // 2
+
+
+def test_market_orders_count_at_every_price():
+    bids = [parse_order(order_json("buy", 0, 5, orderType="market"))]
+    asks = orders(("sell", 100, 3), ("sell", 105, 3))
+    assert clearing_price(bids, asks) == ticks(105)
+
+
+def test_clear_fills_at_uniform_price():
+    book = Book()
+    add_orders(book, [order_json("buy", 105, 6, owner=ALICE), order_json("buy", 101, 4, owner=BOB),
+                      order_json("sell", 99, 5), order_json("sell", 100, 3)])
+    fills = clear(book)
+
+    assert {price for _, _, price, _, _ in fills} == {100.5}
+    assert sum(base for _, _, _, base, _ in fills) == 8
+    assert all(quote == base * 100 + base // 2 for _, _, _, base, quote in fills)
+    # the short side (asks) filled completely, the best bid first
+    assert not book[PAIR]["sell"]
+    assert [(o.owner, o.amount_in) for o in book[PAIR]["buy"]] == [(BOB, 2)]
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: MIT
+# iDarkPool Batched Settlement Test – local anvil
+# Sends N settle() calls back-to-back through SettlementSubmitter
+
+import os, sys, time, json
+from dotenv import load_dotenv
+from web3 import Web3
+from eth_account import Account
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from settlement import SettlementSubmitter
+from signer import TradeSigner
+
+# -------------------------------------------------
+# 1️⃣  Load config
+# -------------------------------------------------
+load_dotenv()
+RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:8545")
+PRIVATE_KEY = os.getenv("ENCLAVE_PRIV")              # enclave signer key + token owner
+CHAIN_ID = int(os.getenv("CHAIN_ID", 31337))
+SETTLEMENT_ADDR = os.getenv("SETTLEMENT_ADDR")
+WETHM_ADDR = os.getenv("WETHM_ADDR")
+USDCM_ADDR = os.getenv("USDCM_ADDR")
+TAKER_PRIV = os.getenv("TAKER_PRIV")
+N_TRADES = int(os.getenv("N_TRADES", "20"))
+
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
+enclave = Account.from_key(PRIVATE_KEY)
+taker = Account.from_key(TAKER_PRIV)
+
+def load_abi(name):
+    with open(f"abi/{name}.json") as f:
+        data = json.load(f)
+        return data["abi"] if isinstance(data, dict) else data
+
+weth = w3.eth.contract(address=Web3.to_checksum_address(WETHM_ADDR), abi=load_abi("WETHm"))
+usdc = w3.eth.contract(address=Web3.to_checksum_address(USDCM_ADDR), abi=load_abi("USDCm"))
+settlement = w3.eth.contract(address=Web3.to_checksum_address(SETTLEMENT_ADDR), abi=load_abi("DarkPoolSettlement"))
+
+# -------------------------------------------------
+# 2️⃣  Fund contract (maker) and taker, approve
+# -------------------------------------------------
+def setup():
+    owner = SettlementSubmitter(w3, settlement, PRIVATE_KEY, CHAIN_ID)
+    hashes = [
+        owner.send(weth.functions.mint(SETTLEMENT_ADDR, Web3.to_wei(N_TRADES, "ether"))),
+        owner.send(usdc.functions.mint(taker.address, Web3.to_wei(2000 * N_TRADES, "ether"))),
+    ]
+    owner.wait_all(hashes)
+
+    t = SettlementSubmitter(w3, settlement, TAKER_PRIV, CHAIN_ID)
+    t.wait_all([t.send(usdc.functions.approve(SETTLEMENT_ADDR, 2**256 - 1))])
+    print("✅ Funded and approved.")
+
+# -------------------------------------------------
+# 3️⃣  Build, sign, submit
+# -------------------------------------------------
+def build_trades():
+    now = int(time.time())
+    return [{
+        "maker": SETTLEMENT_ADDR,
+        "taker": taker.address,
+        "tokenA": WETHM_ADDR,
+        "tokenB": USDCM_ADDR,
+        "amountA": Web3.to_wei(1, "ether"),
+        "amountB": Web3.to_wei(2000, "ether"),
+        "nonce": now * 1000 + i,
+        "deadline": now + 600,
+    } for i in range(N_TRADES)]
+
+if __name__ == "__main__":
+    print(f"\n=== iDarkPool Batched Settlement ({N_TRADES} trades) ===")
+    setup()
+
+    trades = build_trades()
+    sigs = TradeSigner(PRIVATE_KEY).sign_trades(trades)
+
+    sub = SettlementSubmitter(w3, settlement, TAKER_PRIV, CHAIN_ID)
+    t0 = time.time()
+    hashes = sub.settle_many(zip(trades, sigs))
+    receipts = sub.wait_all(hashes)
+    dt = time.time() - t0
+
+    ok = sum(r.status == 1 for r in receipts)
+    blocks = sorted({r.blockNumber for r in receipts})
+    print(f"✅ {ok}/{len(receipts)} settled in {dt:.2f}s across blocks {blocks[0]}..{blocks[-1]}")
@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+
+import journal
+import orderbook
+from conftest import BASE, BOB, QUOTE, order_json
+from intake import Quarantine
+from order import PRICE_SCALE
+from orderbook import CorruptBookError, add_orders, load_book, save_book
+from snapshot import Snapshot, pack
+
+PAIR = (BASE, QUOTE)
+
+
+def dump(book):
+    return {pair: {side: [(o.oid, o.to_json()) for o in part[side]] for side in ("buy", "sell")}
+            for pair, part in book.items() if part["buy"] or part["sell"]}
+
+
+def seeded():
+    """A book saved once (snapshot only) with two bids and an ask."""
+    book = load_book()
+    add_orders(book, [order_json("buy", 2000), order_json("buy", 1990, deadline=2**40),
+                      order_json("sell", 2010, owner=BOB, extra="kept")])
+    save_book(book)
+    return book
+
+
+def test_snapshot_round_trip(book_paths):
+    book = seeded()
+    snap = Snapshot(pack(book))
+    assert snap.n_orders == 3
+    assert {p: {s: [(o.oid, o.to_json()) for o in snap.side(p, s)] for s in ("buy", "sell")}
+            for p in snap.directory} == dump(book)
+
+
+def test_snapshot_checksum_and_version(book_paths):
+    data = bytearray(pack(seeded()))
+    data[-1] ^= 1
+    with pytest.raises(ValueError, match="checksum"):
+        Snapshot(bytes(data))
+    data[-1] ^= 1
+    data[4] = 2
+    with pytest.raises(ValueError, match="version"):
+        Snapshot(bytes(data))
+
+
+def test_journal_replay(book_paths):
+    book = seeded()
+    bid = book[PAIR]["buy"][0]
+    bid.amount_in -= 4
+    bid.amount_out -= 8000
+    book.log_fill(bid)
+    orderbook.remove_orders(book, PAIR, "sell", set(book[PAIR]["sell"]), "cancel")
+    add_orders(book, [order_json("sell", 2020)])
+    save_book(book)
+    assert os.path.exists(orderbook.JOURNAL_PATH)
+
+    assert dump(load_book()) == dump(book)
+
+
+def test_stale_journal_is_dropped(book_paths):
+    book = seeded()
+    add_orders(book, [order_json("sell", 2020)])
+    save_book(book)
+    # compaction wrote the new snapshot, then died before dropping the journal
+    orderbook._atomic_write(orderbook.BOOK_PATH, pack(book))
+
+    assert dump(load_book()) == dump(book)
+    assert not os.path.exists(orderbook.JOURNAL_PATH)
+
+
+def test_torn_journal_tail_is_dropped(book_paths):
+    book = seeded()
+    add_orders(book, [order_json("sell", 2020)])
+    save_book(book)
+    size = os.path.getsize(orderbook.JOURNAL_PATH)
+    with open(orderbook.JOURNAL_PATH, "a") as f:
+        f.write('0badc0de {"op":"add","oid":9')
+
+    assert dump(load_book()) == dump(book)
+    assert os.path.getsize(orderbook.JOURNAL_PATH) == size
+
+
+def test_corrupt_journal_line_is_fatal(book_paths):
+    book = seeded()
+    add_orders(book, [order_json("sell", 2020), order_json("sell", 2030)])
+    save_book(book)
+    with open(orderbook.JOURNAL_PATH) as f:
+        lines = f.readlines()
+    lines[1] = lines[1].replace("2020", "2021")
+    with open(orderbook.JOURNAL_PATH, "w") as f:
+        f.writelines(lines)
+
+    with pytest.raises(CorruptBookError, match="checksum mismatch"):
+        load_book()
+
+
+def test_journal_without_snapshot_is_fatal(book_paths):
+    journal.append(orderbook.JOURNAL_PATH, [{"op": "remove", "oid": 1, "reason": "fill"}], 0)
+    with pytest.raises(CorruptBookError):
+        load_book()
+
+
+def test_compaction(book_paths, monkeypatch):
+    monkeypatch.setattr(orderbook, "COMPACT_MIN_ENTRIES", 1)
+    book = seeded()
+    add_orders(book, [order_json("sell", 2020), order_json("sell", 2030)])
+    save_book(book)
+
+    assert not os.path.exists(orderbook.JOURNAL_PATH)
+    assert book.snapshot_id == Snapshot.open(orderbook.BOOK_PATH).checksum
+    assert dump(load_book()) == dump(book)
+
+
+def test_legacy_book_drops_invalid_orders(book_paths):
+    # what the JSON-based MM wrote: enclave key as owner, placeholder tokens
+    legacy_mm = {"owner": "0x" + "42" * 32, "side": "buy", "orderType": "limit",
+                 "tokenIn": "0xWETHm", "tokenOut": "0xUSDCm", "amountIn": "1", "amountOut": "2020",
+                 "price": 2020.0, "deadline": 9999999999}
+    user = order_json("sell", 2010, owner=BOB, ts=5)
+    with open(orderbook.BOOK_JSON_PATH, "w") as f:
+        json.dump({"buy": [legacy_mm], "sell": [user, "junk"]}, f)
+
+    with Quarantine(str(book_paths / "q.jsonl")) as q:
+        book = load_book(q)
+    (o,) = [o for part in book.values() for side in ("buy", "sell") for o in part[side]]
+    assert (o.owner, o.price, o.ts) == (BOB, 2010 * PRICE_SCALE, 5)
+    rejected = (book_paths / "q.jsonl").read_text()
+    assert [r["index"] for r in map(json.loads, rejected.splitlines())] == [0, 2]
+    assert "42" * 32 not in rejected
+
+
+def test_pair_keyed_json_round_trip(book_paths):
+    book = seeded()
+    orderbook.export_orderbook(book=book)
+    assert dump(orderbook.import_orderbook()) == dump(book)
@@ -0,0 +1,91 @@
+import io
+import json
+
+import pytest
+
+from conftest import BASE, QUOTE, order_json
+from intake import Quarantine, iter_array, read_orders
+from order import InvalidOrder, parse_order
+
+
+def test_parse_order_normalizes():
+    o = parse_order(order_json("sell", "2000.5", owner="0x" + "AB" * 20, ts=1, memo="hi"))
+    assert o.owner == "0x" + "ab" * 20 and o.pair == (BASE, QUOTE)
+    assert o.price == 2000_500000000000000000 and o.price_str
+    assert o.ts is None                       # stamped by the book, not the client
+    assert o.extra == {"memo": "hi"}
+
+
+@pytest.mark.parametrize("patch, reason", [
+    ({"side": "hold"}, "side"),
+    ({"orderType": "stop"}, "orderType"),
+    ({"owner": "0x1234"}, "owner"),
+    ({"tokenOut": BASE}, "same token"),
+    ({"amountIn": "-5"}, "amountIn must be positive"),
+    ({"amountIn": "\u00b2"}, "amountIn must be an integer"),
+    ({"amountIn": 0}, "amountIn"),
+    ({"amountIn": 1.5}, "amountIn"),
+    ({"amountIn": True}, "amountIn"),
+    ({"amountIn": str(2**256)}, "uint256"),
+    ({"price": "abc"}, "price"),
+    ({"price": float("nan")}, "price"),
+    ({"price": -1}, "price"),
+    ({"price": 1e-30}, "price"),
+    ({"price": 2**256}, "price"),
+    ({"deadline": "soon"}, "deadline"),
+    ({"deadline": -1}, "deadline"),
+    ({"deadline": 2**64}, "deadline"),
+])
+def test_parse_order_rejects(patch, reason):
+    with pytest.raises(InvalidOrder, match=reason):
+        parse_order({**order_json(), **patch})
+
+
+def test_parse_order_bounds_inclusive():
+    o = parse_order(order_json(base=2**256 - 1, quote=1, price=1e-18, deadline=2**64 - 1))
+    assert (o.amount_in, o.price, o.deadline) == (2**256 - 1, 1, 2**64 - 1)
+    assert parse_order(order_json(orderType="market", price=0)).price == 0
+
+
+@pytest.mark.parametrize("chunk", [*range(1, 24), 1 << 16])
+def test_iter_array_across_chunks(chunk):
+    items = [{"a": 1}, [1, 2], "x, ]", -1.5e10, 12345678901234567890, None, True, False,
+             "\u00e9\\\"" * 3, {"deep": [{"x": "y" * 40}]}, -0.0]
+    assert list(iter_array(io.StringIO(json.dumps(items, ensure_ascii=True)), chunk)) == items
+
+
+def test_iter_array_stops_at_a_malformed_record():
+    class Counting(io.StringIO):
+        read_chars = 0
+
+        def read(self, n=-1):
+            data = super().read(n)
+            self.read_chars += len(data)
+            return data
+
+    f = Counting('[{"a": 1}, {"a":1,,}, ' + ", ".join(['{"pad": "%s"}' % ("x" * 100)] * 10_000) + "]")
+    with pytest.raises(ValueError, match="malformed JSON at char 18"):
+        list(iter_array(f, 4096))
+    assert f.read_chars <= 2 * 4096
+
+
+@pytest.mark.parametrize("text, yielded", [("{}", 0), ("[1, 2", 2), ("[1 2]", 1), ("[1,,2]", 1)])
+def test_iter_array_malformed(text, yielded):
+    got = []
+    with pytest.raises(ValueError):
+        for x in iter_array(io.StringIO(text), 2):
+            got.append(x)
+    assert len(got) == yielded
+
+
+def test_read_orders_quarantines(tmp_path):
+    path = tmp_path / "orders.json"
+    bad = order_json(price=-1)
+    path.write_text(json.dumps([order_json(), bad, "nope", order_json("sell")])[:-1] + ", {")
+    with Quarantine(str(tmp_path / "q.jsonl")) as q:
+        orders = list(read_orders(str(path), q, chunk_size=16))
+    assert [o.side for o in orders] == ["buy", "sell"]
+
+    rejected = [json.loads(line) for line in (tmp_path / "q.jsonl").read_text().splitlines()]
+    assert [(r["index"], r.get("record")) for r in rejected] == [(1, bad), (2, "nope"), (4, None)]
+    assert "price" in rejected[0]["reason"] and "malformed" in rejected[2]["reason"]
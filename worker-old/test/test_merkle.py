@@ -0,0 +1,56 @@
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from eth_utils import keccak, to_bytes
+
+import merkle
+from conftest import ALICE, BASE, QUOTE
+from match_engine import sign_batch
+from trade_hash import hash_trade
+
+KEY = "0x" + "42" * 32
+
+
+def leaves(n):
+    return [keccak(i.to_bytes(32, "big")) for i in range(n)]
+
+
+@pytest.mark.parametrize("n", range(1, 10))
+def test_every_proof_verifies(n):
+    ls = leaves(n)
+    root, proofs = merkle.build(ls)
+    assert all(merkle.verify(p, root, leaf) for p, leaf in zip(proofs, ls))
+
+
+def test_sorted_pair_hashing():
+    a, b, c = leaves(3)
+    ab = keccak(min(a, b) + max(a, b))
+    # OpenZeppelin's commutative hash; the odd leaf is carried up unchanged
+    assert merkle.build([a, b])[0] == ab
+    assert merkle.build([a, b, c])[0] == keccak(min(ab, c) + max(ab, c))
+    assert merkle.build([a]) == (a, [[]])
+
+
+def test_bad_proofs_fail():
+    ls = leaves(5)
+    root, proofs = merkle.build(ls)
+    assert not merkle.verify(proofs[1], root, ls[0])
+    assert not merkle.verify(proofs[0][:-1], root, ls[0])
+    assert not merkle.verify(proofs[0], root, keccak(b"other"))
+
+
+def test_no_leaves():
+    with pytest.raises(ValueError):
+        merkle.build([])
+
+
+def test_sign_batch_signs_the_root():
+    trades = [{"maker": QUOTE, "taker": ALICE, "tokenA": BASE, "tokenB": QUOTE,
+               "amountA": str(i + 1), "amountB": "2000", "nonce": i, "deadline": 10**10} for i in range(3)]
+    root, sig, hashes, proofs = sign_batch(trades, KEY)
+
+    assert hashes == ["0x" + hash_trade(t).hex() for t in trades]
+    assert all(merkle.verify([to_bytes(hexstr=p) for p in proof], to_bytes(hexstr=root), hash_trade(t))
+               for t, proof in zip(trades, proofs))
+    signer = Account.recover_message(encode_defunct(to_bytes(hexstr=root)), signature=sig)
+    assert signer == Account.from_key(KEY).address
@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: MIT
+# iDarkPool Merkle Batch Settlement Test – local anvil
+# Signs one Merkle root for N trades and settles them through settleBatch()
+#
+# Needs a DarkPoolSettlement built from contracts/src (with settleBatch)
+# deployed at SETTLEMENT_ADDR, and ENCLAVE_PRIV as its enclave signer.
+
+import os, sys, time, json
+from dotenv import load_dotenv
+from web3 import Web3
+from eth_account import Account
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import merkle
+from match_engine import sign_batch
+from settlement import SETTLE_BATCH_ABI, SettlementSubmitter
+from trade_hash import hash_trade, trade_tuple
+
+# -------------------------------------------------
+# 1️⃣  Load config
+# -------------------------------------------------
+load_dotenv()
+RPC_URL = os.getenv("RPC_URL", "http://127.0.0.1:8545")
+PRIVATE_KEY = os.getenv("ENCLAVE_PRIV")              # enclave signer key + token owner
+CHAIN_ID = int(os.getenv("CHAIN_ID", 31337))
+SETTLEMENT_ADDR = os.getenv("SETTLEMENT_ADDR")
+WETHM_ADDR = os.getenv("WETHM_ADDR")
+USDCM_ADDR = os.getenv("USDCM_ADDR")
+TAKER_PRIV = os.getenv("TAKER_PRIV")
+N_TRADES = int(os.getenv("N_TRADES", "7"))          # odd, so one leaf is carried up unpaired
+CHUNK = int(os.getenv("CHUNK", "3"))                # trades per settleBatch() transaction
+
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
+taker = Account.from_key(TAKER_PRIV)
+
+def load_abi(name):
+    with open(f"abi/{name}.json") as f:
+        data = json.load(f)
+        return data["abi"] if isinstance(data, dict) else data
+
+weth = w3.eth.contract(address=Web3.to_checksum_address(WETHM_ADDR), abi=load_abi("WETHm"))
+usdc = w3.eth.contract(address=Web3.to_checksum_address(USDCM_ADDR), abi=load_abi("USDCm"))
+settlement = w3.eth.contract(address=Web3.to_checksum_address(SETTLEMENT_ADDR), abi=load_abi("DarkPoolSettlement"))
+batch = w3.eth.contract(address=settlement.address, abi=SETTLE_BATCH_ABI)
+
+# -------------------------------------------------
+# 2️⃣  Fund contract (maker) and taker, approve
+# -------------------------------------------------
+def setup():
+    owner = SettlementSubmitter(w3, settlement, PRIVATE_KEY, CHAIN_ID)
+    hashes = [
+        owner.send(weth.functions.mint(SETTLEMENT_ADDR, Web3.to_wei(N_TRADES, "ether"))),
+        owner.send(usdc.functions.mint(taker.address, Web3.to_wei(2000 * N_TRADES, "ether"))),
+    ]
+    owner.wait_all(hashes)
+
+    t = SettlementSubmitter(w3, settlement, TAKER_PRIV, CHAIN_ID)
+    t.wait_all([t.send(usdc.functions.approve(SETTLEMENT_ADDR, 2**256 - 1))])
+    print("✅ Funded and approved.")
+
+# -------------------------------------------------
+# 3️⃣  Build, sign root, submit in chunks
+# -------------------------------------------------
+def build_trades():
+    now = int(time.time())
+    return [{
+        "maker": SETTLEMENT_ADDR,
+        "taker": taker.address,
+        "tokenA": WETHM_ADDR,
+        "tokenB": USDCM_ADDR,
+        "amountA": Web3.to_wei(1, "ether"),
+        "amountB": Web3.to_wei(2000, "ether"),
+        "nonce": now * 1000 + i,
+        "deadline": now + 600,
+    } for i in range(N_TRADES)]
+
+def reverts(trades, proofs, root, sig) -> bool:
+    """True if settleBatch() would revert for these arguments."""
+    fn = batch.functions.settleBatch(
+        [trade_tuple(t) for t in trades],
+        [[bytes.fromhex(p[2:]) for p in proof] for proof in proofs],
+        bytes.fromhex(root[2:]),
+        bytes.fromhex(sig[2:]),
+    )
+    try:
+        fn.call({"from": taker.address})
+    except Exception:
+        return True
+    return False
+
+if __name__ == "__main__":
+    print(f"\n=== iDarkPool Merkle Batch Settlement ({N_TRADES} trades, {CHUNK} per tx) ===")
+    setup()
+
+    trades = build_trades()
+    root, sig, leaves, proofs = sign_batch(trades, PRIVATE_KEY)
+    assert all(merkle.verify([bytes.fromhex(p[2:]) for p in proof], bytes.fromhex(root[2:]), hash_trade(t))
+               for t, proof in zip(trades, proofs)), "local proofs do not verify"
+
+    # a proof for another leaf must be rejected on chain
+    assert reverts(trades[:1], proofs[1:2], root, sig), "swapped proof was accepted"
+
+    sub = SettlementSubmitter(w3, settlement, TAKER_PRIV, CHAIN_ID)
+    t0 = time.time()
+    receipts = sub.wait_all(sub.settle_batch(trades, proofs, root, sig, chunk=CHUNK))
+    dt = time.time() - t0
+
+    ok = sum(r.status == 1 for r in receipts)
+    done = sum(settlement.functions.executed(bytes.fromhex(h[2:])).call() for h in leaves)
+    gas = sum(r.gasUsed for r in receipts)
+    print(f"✅ {ok}/{len(receipts)} settleBatch tx, {done}/{N_TRADES} trades executed "
+          f"in {dt:.2f}s, {gas // N_TRADES} gas/trade")
+    assert ok == len(receipts) and done == N_TRADES
+
+    # replaying a settled trade must fail
+    assert reverts(trades[:1], proofs[:1], root, sig), "settled trade was replayed"
+    print("✅ Bad proof and replay rejected.")
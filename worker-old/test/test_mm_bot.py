@@ -0,0 +1,62 @@
+from conftest import BASE, QUOTE
+from mm_bot import inject_mm_quotes, ladder
+from mm_strategy import InventorySkewStrategy, StaticStrategy
+from orderbook import Book, load_book, save_book
+
+MM = "0x" + "09" * 20
+PAIR = (BASE, QUOTE)
+
+
+def test_ladder_stops_before_zero_bids():
+    bids, asks, base, quote = ladder(2000.0, 1000, 50, 25, 1.0)
+    # 50 + 25 * i bps stays below 100% up to level 397
+    assert len(bids) == len(asks) == len(base) == len(quote) == 398
+    assert min(bids) > 0 and bids == sorted(bids, reverse=True)
+
+
+def test_deep_ladder_can_be_persisted(book_paths):
+    book = Book()
+    inject_mm_quotes(book, 2000.0, MM, BASE, QUOTE, levels=1000)
+    save_book(book)
+    assert len(load_book()[PAIR]["buy"]) == len(book[PAIR]["buy"])
+
+
+def test_crossing_bid_without_levels():
+    book = Book()
+    inject_mm_quotes(book, 2000.0, MM, BASE, QUOTE, levels=0, size_base=2.0)
+    (bid,) = book[PAIR]["buy"]
+    assert (bid.price, bid.amount_in, bid.amount_out) == (2020 * 10**18, 2 * 10**18, 4000 * 10**18)
+    assert not book[PAIR]["sell"]
+
+
+def test_resync_keeps_unchanged_quotes():
+    book = Book()
+    inject_mm_quotes(book, 2000.0, MM, BASE, QUOTE)
+    before = {o.oid for side in ("buy", "sell") for o in book[PAIR][side]}
+    book.pending.clear()
+    inject_mm_quotes(book, 2000.0, MM, BASE, QUOTE)
+    assert {o.oid for side in ("buy", "sell") for o in book[PAIR][side]} == before
+    assert book.pending == []
+
+
+def test_crossing_bid_crosses_a_wide_strategy_ladder():
+    book = Book()
+    wide = StaticStrategy(spread_bps=300, size_base=1.0)
+    inject_mm_quotes(book, 2000.0, MM, BASE, QUOTE, strategy=wide)
+    best_bid, best_ask = book[PAIR]["buy"][0], book[PAIR]["sell"][0]
+    assert best_bid.price >= best_ask.price == 2060 * 10**18
+
+
+def test_volatility_is_measured_per_run(tmp_path):
+    s = InventorySkewStrategy(path=str(tmp_path / "mm.json"))
+    # fills inside one run walk the ladder; only the run's price counts
+    for price in (2010.0, 1990.0, 2015.0, 1985.0):
+        s.on_fill(price, 0)
+    s.on_run(2000.0)
+    assert s.quote(2000.0).spread_bps == 50
+
+    s.on_run(2020.0)
+    s.on_run(2000.0)
+    assert 50 < s.quote(2000.0).spread_bps <= s.max_spread_bps
+    s.save()
+    assert InventorySkewStrategy.load(str(tmp_path / "mm.json")).quote(2000.0) == s.quote(2000.0)
@@ -0,0 +1,41 @@
+from conftest import ALICE, BASE, BOB, QUOTE
+from match_engine import net_fills
+from trade_hash import hash_trade
+
+SETTLEMENT = "0x" + "cc" * 20
+
+
+def fill(taker, base, quote, price, deadline=1000, maker=SETTLEMENT, token_a=BASE):
+    return {"price": price, "trade": {
+        "maker": maker, "taker": taker, "tokenA": token_a, "tokenB": QUOTE,
+        "amountA": str(base), "amountB": str(quote), "nonce": 0, "deadline": deadline}}
+
+
+def test_merges_per_taker_and_pair():
+    fills = [fill(ALICE, 2, 200, 100.0), fill(BOB, 1, 101, 101.0),
+             fill(ALICE.upper().replace("X", "x"), 6, 612, 102.0, deadline=900)]
+    a, b = net_fills(fills, run_nonce=7)
+
+    assert (a["fills"], b["fills"]) == (2, 1)
+    assert (a["trade"]["amountA"], a["trade"]["amountB"]) == ("8", "812")
+    assert a["trade"]["deadline"] == 900
+    assert a["price"] == (2 * 100.0 + 6 * 102.0) / 8
+    assert b["trade"] == fills[1]["trade"] | {"nonce": (7 << 32) + 1}
+
+
+def test_distinct_nonces_keep_hashes_apart():
+    # same taker on two pairs with identical amounts must not share a hash
+    out = net_fills([fill(ALICE, 1, 100, 100.0), fill(ALICE, 1, 100, 100.0, token_a=BOB)], run_nonce=1)
+    assert [t["trade"]["nonce"] for t in out] == [1 << 32, (1 << 32) + 1]
+    assert hash_trade(out[0]["trade"]) != hash_trade(out[1]["trade"] | {"tokenA": BASE})
+
+
+def test_different_makers_never_merge():
+    out = net_fills([fill(ALICE, 1, 100, 100.0), fill(ALICE, 1, 100, 100.0, maker=BOB)])
+    assert len(out) == 2
+
+
+def test_input_is_not_modified():
+    fills = [fill(ALICE, 1, 100, 100.0), fill(ALICE, 1, 100, 100.0)]
+    net_fills(fills)
+    assert fills[0]["trade"]["amountA"] == "1" and fills[0]["trade"]["nonce"] == 0
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from conftest import ALICE, BASE, BOB, order_json
+from orderbook import Book, add_orders
+from precheck import FundingChecker, drop_unfunded
+
+SETTLEMENT = "0x" + "cc" * 20
+MM = "0x" + "09" * 20
+
+
+class FakeNode:
+    """No Multicall3; balanceOf/allowance on `reverting` tokens return a JSON-RPC error."""
+
+    def __init__(self, funds, reverting=()):
+        self.funds = funds
+        self.reverting = {t.lower() for t in reverting}
+        self.batches = 0
+        self.eth = SimpleNamespace(block_number=1, get_code=lambda addr, block: b"")
+        self.provider = SimpleNamespace(make_batch_request=self._batch)
+
+    def _batch(self, requests):
+        self.batches += 1
+        out = []
+        for i, (method, (call, block)) in enumerate(requests):
+            if call["to"].lower() in self.reverting:
+                out.append({"id": i, "jsonrpc": "2.0", "error": {"code": 3, "message": "execution reverted"}})
+            else:
+                out.append({"id": i, "jsonrpc": "2.0", "result": "0x" + self.funds.to_bytes(32, "big").hex()})
+        return out
+
+
+def book_with(*records):
+    book = Book()
+    add_orders(book, [order_json(*r[:3], owner=r[3]) for r in records])
+    return book
+
+
+def test_reverting_token_counts_as_no_funds():
+    # asks are paid from the contract's BASE balance, whose balanceOf reverts
+    book = book_with(("buy", 2000, 1, ALICE), ("sell", 2000, 1, BOB), ("sell", 2001, 1, MM))
+    node = FakeNode(funds=10**30, reverting=[BASE])
+    assert drop_unfunded(book, FundingChecker(node, SETTLEMENT), exempt=MM) == 1
+
+    (part,) = book.values()
+    assert [o.owner for o in part["buy"]] == [ALICE]
+    assert [o.owner for o in part["sell"]] == [MM]
+    assert node.batches == 1
+
+
+def test_shared_budget_drops_later_orders():
+    book = book_with(("buy", 2000, 1, ALICE), ("buy", 1999, 1, ALICE))
+    # ALICE pays 2000 and 1999 QUOTE units but only holds 3000
+    assert drop_unfunded(book, FundingChecker(FakeNode(funds=3000), SETTLEMENT)) == 1
+    (part,) = book.values()
+    assert [o.price for o in part["buy"]] == [2000 * 10**18]
@@ -0,0 +1,97 @@
+import struct
+import zipfile
+
+import pytest
+
+from conftest import ALICE, BASE, QUOTE
+from protected_data import ORDER_SCHEMA, ProtectedData, dataset_paths, load_orders, read_order
+
+
+def string(s):
+    data = s.encode()
+    return struct.pack("<I", len(data)) + data
+
+
+def i128(n):
+    return n.to_bytes(16, "little", signed=True)
+
+
+def f64(x):
+    return struct.pack("<d", x)
+
+
+def members(**patch):
+    m = {"side": string("buy"), "tokenIn": string(BASE), "tokenOut": string(QUOTE),
+         "amountIn": i128(10**18), "amountOut": i128(2000 * 10**18), "price": f64(2000.0),
+         "deadline": i128(2**40), "owner": string(ALICE)}
+    m.update(patch)
+    return {k: v for k, v in m.items() if v is not None}
+
+
+def dataset(path, **patch):
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members(**patch).items():
+            z.writestr(name, data)
+    return str(path)
+
+
+def test_read_order(tmp_path):
+    with ProtectedData(dataset(tmp_path / "a.zip", orderType=string("limit"))) as data:
+        order = read_order(data)
+        assert data.get("price", "f64") is data.get("price", "f64")
+    assert order == {"side": "buy", "tokenIn": BASE, "tokenOut": QUOTE, "amountIn": str(10**18),
+                     "amountOut": str(2000 * 10**18), "price": 2000.0, "deadline": 2**40,
+                     "owner": ALICE, "orderType": "limit"}
+
+
+def test_schema_reports_the_bad_field(tmp_path):
+    with ProtectedData(dataset(tmp_path / "a.zip", price=b"\x00" * 4)) as data:
+        with pytest.raises(Exception, match='"price" as "f64"'):
+            ORDER_SCHEMA.parse(data)
+
+
+def test_load_orders(tmp_path):
+    paths = [dataset(tmp_path / "good.zip"),
+             dataset(tmp_path / "f64.zip", price=b"\x00" * 4),
+             dataset(tmp_path / "deadline.zip", deadline=i128(-1)),
+             dataset(tmp_path / "amount.zip", amountIn=i128(-5)),
+             dataset(tmp_path / "missing.zip", tokenOut=None),
+             str(tmp_path / "nozip.zip"),
+             dataset(tmp_path / "good2.zip", side=string("sell"), tokenIn=string(QUOTE), tokenOut=string(BASE))]
+    (tmp_path / "nozip.zip").write_bytes(b"not a zip")
+
+    orders, rejected = load_orders(paths, workers=3)
+    assert [o.side for o in orders] == ["buy", "sell"]
+    assert orders[0].owner == ALICE and orders[0].amount_in == 10**18
+
+    reasons = {p.rsplit("/", 1)[1]: r for p, r in rejected}
+    assert list(reasons) == ["f64.zip", "deadline.zip", "amount.zip", "missing.zip", "nozip.zip"]
+    assert "price" in reasons["f64.zip"]
+    assert "deadline" in reasons["deadline.zip"]
+    assert reasons["amount.zip"] == "amountIn must be positive and fit in uint256"
+    assert "tokenOut" in reasons["missing.zip"]
+    assert "Failed to open" in reasons["nozip.zip"]
+
+
+def test_load_orders_empty():
+    assert load_orders([]) == ([], [])
+
+
+def test_dataset_paths_bulk(tmp_path, monkeypatch):
+    monkeypatch.setenv("IEXEC_BULK_SLICE_SIZE", "3")
+    monkeypatch.setenv("IEXEC_DATASET_1_FILENAME", "one.zip")
+    monkeypatch.delenv("IEXEC_DATASET_2_FILENAME", raising=False)
+    monkeypatch.setenv("IEXEC_DATASET_3_FILENAME", "three.zip")
+    monkeypatch.setenv("IEXEC_DATASET_FILENAME", "ignored.zip")
+    assert dataset_paths(str(tmp_path)) == [str(tmp_path / "one.zip"), str(tmp_path / "three.zip")]
+
+
+def test_dataset_paths_single_and_glob(tmp_path, monkeypatch):
+    monkeypatch.delenv("IEXEC_BULK_SLICE_SIZE", raising=False)
+    monkeypatch.setenv("IEXEC_DATASET_FILENAME", "only.zip")
+    assert dataset_paths(str(tmp_path)) == [str(tmp_path / "only.zip")]
+
+    monkeypatch.delenv("IEXEC_DATASET_FILENAME")
+    for name in ("b.zip", "a.zip", "orders.json"):
+        (tmp_path / name).write_bytes(b"")
+    assert dataset_paths(str(tmp_path)) == [str(tmp_path / "a.zip"), str(tmp_path / "b.zip")]
@@ -0,0 +1,79 @@
+from conftest import ALICE, BASE, BOB, QUOTE, order_json
+from match_engine import sweep
+from orderbook import Book, add_orders
+
+PAIR = (BASE, QUOTE)
+MAKER = "0x" + "33" * 20
+
+
+def book_of(*records):
+    book = Book()
+    add_orders(book, records)
+    return book
+
+
+def test_fill_is_charged_at_the_reported_price():
+    book = book_of(order_json("buy", 100, 10, owner=ALICE), order_json("sell", 90, 4, owner=BOB))
+    ((buy, sell, price, base, quote),) = sweep(book)
+
+    assert (price, base, quote) == (95.0, 4, 380)
+    # the buy's residual keeps its own limit ratio
+    (rest,) = book[PAIR]["buy"]
+    assert (rest.owner, rest.amount_in, rest.amount_out) == (ALICE, 6, 600)
+    assert not book[PAIR]["sell"]
+
+
+def test_sweep_walks_price_time_priority():
+    book = book_of(order_json("sell", 101, 3, owner=BOB), order_json("sell", 99, 2, owner=BOB),
+                   order_json("buy", 100, 2, owner=ALICE), order_json("buy", 102, 4, owner=ALICE))
+    fills = sweep(book)
+
+    assert [(b.price // 10**18, s.price // 10**18, price, base, quote) for b, s, price, base, quote in fills] == [
+        (102, 99, 100.5, 2, 201),
+        (102, 101, 101.5, 2, 203),
+    ]
+    # 101 ask has 1 left, 100 bid no longer crosses it
+    assert [(o.price // 10**18, o.amount_out) for o in book[PAIR]["sell"]] == [(101, 1)]
+    assert [(o.price // 10**18, o.amount_in) for o in book[PAIR]["buy"]] == [(100, 2)]
+
+
+def test_market_buy_takes_the_ask_price():
+    book = book_of(order_json("buy", 0, 3, quote=1000, orderType="market"), order_json("sell", 99, 5))
+    ((_, _, price, base, quote),) = sweep(book)
+    assert (price, base, quote) == (99.0, 3, 297)
+
+
+def test_max_matches_and_partial_fill_is_journaled():
+    book = book_of(order_json("buy", 100, 10), order_json("sell", 99, 1), order_json("sell", 99, 1))
+    book.pending.clear()
+    assert len(sweep(book, max_matches=1)) == 1
+    assert [e["op"] for e in book.pending] == ["fill", "remove"]
+    assert book[PAIR]["buy"][0].amount_in == 9
+
+
+def test_no_cross():
+    book = book_of(order_json("buy", 99, 1), order_json("sell", 100, 1))
+    assert sweep(book) == []
+
+
+def test_market_orders_never_meet_each_other():
+    book = book_of(order_json("buy", 0, 3, quote=1000, orderType="market", owner=ALICE),
+                   order_json("sell", 0, 2, orderType="market", owner=BOB),
+                   order_json("sell", 105, 1, owner=MAKER), order_json("buy", 95, 5, owner=MAKER))
+    fills = sweep(book)
+
+    # each market order takes the best limit on the other side, earliest first
+    assert [(b.owner, s.owner, price, base) for b, s, price, base, _ in fills] == [
+        (ALICE, MAKER, 105.0, 1),
+        (MAKER, BOB, 95.0, 2),
+    ]
+    assert all(price > 0 for _, _, price, _, _ in fills)
+    # the market buy is left waiting for an ask
+    assert sorted(o.owner for o in book[PAIR]["buy"]) == [ALICE, MAKER]
+    assert not book[PAIR]["sell"]
+
+
+def test_market_against_market_alone_does_not_cross():
+    book = book_of(order_json("buy", 0, 3, quote=1000, orderType="market"),
+                   order_json("sell", 0, 2, orderType="market", owner=BOB))
+    assert sweep(book) == []
@@ -2,12 +2,14 @@
 # iDarkPool Two-Party Settlement Test – Mario Canalella 2025
 # Version v2.1 (with balance logging)
 
-import os, time, json
+import os, sys, time, json, asyncio
 from dotenv import load_dotenv
 from web3 import Web3
 from eth_account import Account
-from eth_account.messages import encode_defunct
-from eth_abi import encode as abi_encode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from async_settlement import AsyncSettlement
+from trade_hash import eth_signed_hash, hash_trade
 
 # -------------------------------------------------
 # 1️⃣  Load config
@@ -78,15 +80,18 @@ def fmt(v):  # clean decimal formatting
     return round(w3.from_wei(v, "ether"), 4)
 
 def get_balances():
+    # one pooled session, all four balanceOf reads in a single JSON-RPC batch
+    async def fetch():
+        async with AsyncSettlement(RPC_URL, SETTLEMENT_ADDR, settlement_abi) as chain:
+            return await chain.balances([
+                (WETHM_ADDR, enclave.address), (USDCM_ADDR, enclave.address),
+                (WETHM_ADDR, taker.address), (USDCM_ADDR, taker.address),
+            ])
+
+    maker_weth, maker_usdc, taker_weth, taker_usdc = asyncio.run(fetch())
     return {
-        "maker": {
-            "WETHm": weth.functions.balanceOf(enclave.address).call(),
-            "USDCm": usdc.functions.balanceOf(enclave.address).call(),
-        },
-        "taker": {
-            "WETHm": weth.functions.balanceOf(taker.address).call(),
-            "USDCm": usdc.functions.balanceOf(taker.address).call(),
-        }
+        "maker": {"WETHm": maker_weth, "USDCm": maker_usdc},
+        "taker": {"WETHm": taker_weth, "USDCm": taker_usdc},
     }
 
 def print_balances(bal, title="Balances"):
@@ -192,24 +197,11 @@ def build_and_sign():
     }
 
     # ✅ Match Solidity: keccak256(abi.encode(...))
-    encoded = abi_encode(
-        ['address','address','address','address','uint256','uint256','uint256','uint256'],
-        [
-            trade["maker"],
-            trade["taker"],
-            trade["tokenA"],
-            trade["tokenB"],
-            trade["amountA"],
-            trade["amountB"],
-            trade["nonce"],
-            trade["deadline"],
-        ]
-    )
-    trade_hash = Web3.keccak(encoded)
+    trade_hash = hash_trade(trade)
     print("🧾 Trade hash:", trade_hash.hex())
 
     # Ethereum Signed Message prefix (exactly like contract)
-    eth_signed = Web3.keccak(b"\x19Ethereum Signed Message:\n32" + trade_hash)
+    eth_signed = eth_signed_hash(trade_hash)
 
     # Sign and verify (works on older eth-account too)
     signed = Account._sign_hash(eth_signed, private_key=PRIVATE_KEY)